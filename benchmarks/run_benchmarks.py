@@ -0,0 +1,153 @@
+"""
+Time every stage of generation on synthetic inputs of growing size.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sizes 10x20x500x1000 100x50x2000x10000 --repeat 3
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<previous>.json
+
+Size format: CARDSxFIELDSxATTRIBUTESxROWS.
+Results are saved to benchmarks/results/<time>-<commit>.json to track regressions between commits.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import make_project
+from src.card_writer import CardWriter
+from src.code_generators import CodeCombiner
+from src.params_handler import ParamsCombiner
+from src.profiler import profiler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+DEFAULT_SIZES = ("10x20x500x1000", "100x50x2000x5000", "500x50x5000x20000")
+
+# Stage is reported as regression when it is slower than in compared results by this ratio
+REGRESSION_RATIO = 1.2
+
+
+def parse_size(size: str) -> dict:
+    cards, fields, attributes, rows = (int(value) for value in size.lower().split("x"))
+    return {"cards": cards, "fields": fields, "attributes": attributes, "rows": rows}
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run_pipeline(directory: str) -> None:
+    """Run all stages once without cache, stages are recorded by profiler."""
+
+    params_combiner = ParamsCombiner(path=directory)
+    cards = params_combiner.prepare_all_cards()
+    ready_code = CodeCombiner(cards).get_code_for_all_cards()
+    CardWriter(os.path.join(directory, "cards")).write_all(ready_code)
+
+
+def benchmark_size(size: str, repeat: int) -> dict:
+    """Return the best wall time of every stage for one input size."""
+
+    params = parse_size(size)
+    best = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        make_project(directory, **params)
+        generation_time = time.perf_counter() - start
+
+        for _ in range(repeat):
+            profiler.reset()
+
+            with profiler.stage("total"):
+                run_pipeline(directory)
+
+            for name, stats in profiler.stages.items():
+                best[name] = min(best.get(name, float("inf")), stats.wall)
+
+    return {
+        "size": size,
+        **params,
+        "input_generation": round(generation_time, 4),
+        "stages": {name: round(seconds, 4) for name, seconds in best.items()},
+        "counters": dict(profiler.counters),
+    }
+
+
+def compare(results: list[dict], filename: str) -> list[str]:
+    """Return stages slower than in previous results file."""
+
+    with open(filename, "r") as f:
+        previous = {result["size"]: result for result in json.load(f)["results"]}
+
+    regressions = []
+
+    for result in results:
+        old = previous.get(result["size"])
+        if old is None:
+            continue
+
+        for name, seconds in result["stages"].items():
+            old_seconds = old["stages"].get(name)
+            if old_seconds and seconds > old_seconds * REGRESSION_RATIO and seconds - old_seconds > 0.005:
+                regressions.append(f"{result['size']} {name}: {old_seconds:.4f} s -> {seconds:.4f} s")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generation stages on synthetic inputs.")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="input sizes CARDSxFIELDSxATTRIBUTESxROWS")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs for every size, the best one is saved")
+    parser.add_argument("--output", help="results file, benchmarks/results/<time>-<commit>.json by default")
+    parser.add_argument("--compare", metavar="FILE", help="previous results to find regressions, exit with error if any")
+    args = parser.parse_args()
+
+    profiler.enabled = True
+    results = []
+
+    for size in args.sizes:
+        result = benchmark_size(size, args.repeat)
+        results.append(result)
+
+        print(f"{size}:")
+        for name, seconds in result["stages"].items():
+            print(f"    {name:<40} {seconds:>9.4f} s")
+
+    commit = get_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }, f, indent=2)
+
+    print(f"Results: {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare)
+
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
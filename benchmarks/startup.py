@@ -0,0 +1,80 @@
+"""
+Measure cold start of the CLI with `python -X importtime`.
+
+Run from the repository root:
+    python -m benchmarks.startup --repeat 5 --top 15
+    python -m benchmarks.startup --max-ms 150   # exit with error above 150 ms, for CI
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules which should never be imported only to show help
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "concurrent.futures.process")
+
+
+def run_importtime(command: list[str]) -> tuple[float, dict[str, int]]:
+    """Run command once, return wall time in ms and cumulative import time in us by module."""
+
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    imports = {}
+
+    # Line format: "import time:       self [us] |  cumulative | imported package"
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports keep their indentation
+        imports[name[1:].rstrip()] = int(cumulative)
+
+    return wall_ms, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup time.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of runs, the best one is shown")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to show")
+    parser.add_argument("--max-ms", type=float, help="fail if the best startup time is above this value")
+    parser.add_argument("command", nargs="*", default=["main.py", "--help"], help="command to measure")
+    args = parser.parse_args()
+
+    runs = [run_importtime(args.command) for _ in range(args.repeat)]
+    wall_ms, imports = min(runs, key=lambda run: run[0])
+
+    print(f"Command: python {' '.join(args.command)}")
+    print(f"Best startup: {wall_ms:.1f} ms of {args.repeat} runs")
+    print(f"Modules imported: {len(imports)}")
+    print()
+    print(f"{'cumulative, ms':>15}  module")
+
+    top_level = {name: us for name, us in imports.items() if not name.startswith(" ")}
+    for name, us in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{us / 1000:>15.1f}  {name}")
+
+    imported = {name.strip() for name in imports}
+    heavy = [name for name in HEAVY_MODULES if name in imported]
+    if heavy:
+        print()
+        print(f"Heavy modules imported: {', '.join(heavy)}")
+
+    if args.max_ms is not None and wall_ms > args.max_ms:
+        print(f"FAILED: startup {wall_ms:.1f} ms is above {args.max_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Generators of synthetic inputs: pmml score cards, model.txt and xlsx with 'Data' sheet.
+
+    python -m benchmarks.synthetic out_dir --cards 100 --fields 50 --attributes 2000 --rows 10000
+"""
+
+import argparse
+import os
+import random
+
+TYPES = ("decimal", "string")
+DATA_TYPES = {"decimal": "double", "string": "string"}
+
+
+def get_param_names(attributes: int) -> list[str]:
+    return [f"PARAM_{i}" for i in range(attributes)]
+
+
+def get_param_types(attributes: int, seed: int = 0) -> list[str]:
+    rnd = random.Random(seed)
+    return [rnd.choice(TYPES) for _ in range(attributes)]
+
+
+def write_pmml(filename: str, score_name: str, params: list[str], types: list[str]) -> None:
+    """Write one pmml card with DataField for every param and small regression model."""
+
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<PMML xmlns="http://www.dmg.org/PMML-4_4" version="4.4">',
+        '  <Header copyright="synthetic"/>',
+        f'  <DataDictionary numberOfFields="{len(params)}">',
+    ]
+
+    for param, _type in zip(params, types):
+        optype = "continuous" if _type == "decimal" else "categorical"
+        lines.append(f'    <DataField dataType="{DATA_TYPES[_type]}" name="{param}" optype="{optype}"/>')
+
+    lines += [
+        '  </DataDictionary>',
+        f'  <RegressionModel functionName="regression" modelName="{score_name}">',
+        '    <MiningSchema>',
+    ]
+    lines += [f'      <MiningField name="{param}"/>' for param in params]
+    lines += ['    </MiningSchema>', '    <RegressionTable intercept="0.0">']
+    lines += [f'      <NumericPredictor name="{param}" coefficient="0.1"/>' for param in params]
+    lines += ['    </RegressionTable>', '  </RegressionModel>', '</PMML>', '']
+
+    with open(filename, "w") as f:
+        f.write("\n".join(lines))
+
+
+def write_pmml_cards(directory: str, cards: int, fields: int, attributes: int, seed: int = 0) -> list[str]:
+    """Write cards with fields params each, taken from attributes params of model."""
+
+    rnd = random.Random(seed)
+    names = get_param_names(attributes)
+    types = get_param_types(attributes, seed)
+    filenames = []
+
+    for i in range(cards):
+        indexes = rnd.sample(range(attributes), min(fields, attributes))
+        filename = os.path.join(directory, f"card_{i:05d}.pmml")
+
+        # Params in cards use different case than in model.txt
+        write_pmml(filename, f"SYN_CARD_{i:05d}", [names[j].lower() for j in indexes], [types[j] for j in indexes])
+        filenames.append(filename)
+
+    return filenames
+
+
+def write_model_txt(filename: str, attributes: int, seed: int = 0) -> None:
+    """Write model.txt with xs:attribute line for every param."""
+
+    with open(filename, "w") as f:
+        for name, _type in zip(get_param_names(attributes), get_param_types(attributes, seed)):
+            f.write(f'<xs:attribute name="{name}" type="xs:{_type}" use="optional"/>\n')
+
+
+def write_xlsx(filename: str, attributes: int, rows: int, sheet_name: str = "Data", seed: int = 0) -> None:
+    """Write excel file with rows of mapping, every param has at least one row, others are duplicates and noise."""
+
+    import pandas
+
+    rnd = random.Random(seed)
+    names = get_param_names(attributes)
+    var_names = []
+
+    for i in range(rows):
+        name = names[i % attributes] if i < attributes or rnd.random() < 0.5 else f"OTHER_{i}"
+        var_names.append(rnd.choice((name, name.lower(), name.capitalize())))
+
+    sheet = pandas.DataFrame({
+        "Id": range(rows),
+        "Var_Name": var_names,
+        "Description": [f"Synthetic parameter {name}" for name in var_names],
+        "OMDM Data_Method": [f"dmi_App_Get_{name.upper()}" for name in var_names],
+    })
+    sheet.to_excel(filename, sheet_name=sheet_name, index=False)
+
+
+def make_project(directory: str, cards: int, fields: int, attributes: int, rows: int, seed: int = 0) -> None:
+    """Write full set of inputs for one run to directory."""
+
+    os.makedirs(directory, exist_ok=True)
+
+    write_pmml_cards(directory, cards, fields, attributes, seed)
+    write_model_txt(os.path.join(directory, "model.txt"), attributes, seed)
+    write_xlsx(os.path.join(directory, "mapping.xlsx"), attributes, rows, seed=seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic inputs.")
+    parser.add_argument("directory")
+    parser.add_argument("--cards", type=int, default=10, help="number of pmml files")
+    parser.add_argument("--fields", type=int, default=20, help="number of DataField in every pmml file")
+    parser.add_argument("--attributes", type=int, default=500, help="number of xs:attribute lines in model.txt")
+    parser.add_argument("--rows", type=int, default=1000, help="number of rows in 'Data' sheet")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    make_project(args.directory, args.cards, args.fields, args.attributes, args.rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare ways of reading the mapping sheet.
+
+Run from the repository root:
+    python -m benchmarks.xlsx_ingestion path/to/mapping.xlsx --repeat 3
+"""
+
+import argparse
+import os
+import time
+
+import pandas
+
+from src.params_handler import XlsxExtractor
+from src.settings import settings
+
+
+def time_call(func, repeat: int) -> float:
+    """Return the best time of several calls in seconds."""
+
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def remove_sidecar(filename: str) -> None:
+    sidecar = f"{os.path.splitext(filename)[0]}.{settings.SHEET_NAME}.csv"
+
+    if os.path.exists(sidecar):
+        os.remove(sidecar)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark excel ingestion modes.")
+    parser.add_argument("filename", help="excel file with mapping sheet")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs for every mode, the best one is shown")
+    args = parser.parse_args()
+
+    results = {}
+
+    # Previous path: all columns of the sheet
+    results["read_excel, all columns"] = time_call(
+        lambda: pandas.read_excel(args.filename, sheet_name=settings.SHEET_NAME), args.repeat
+    )
+
+    for reader in ("pandas", "openpyxl"):
+        results[f"XlsxExtractor(reader='{reader}')"] = time_call(
+            lambda: XlsxExtractor(args.filename, reader=reader), args.repeat
+        )
+
+    # First sidecar run exports csv, next runs only read it
+    remove_sidecar(args.filename)
+    results["XlsxExtractor(reader='sidecar'), export"] = time_call(
+        lambda: XlsxExtractor(args.filename, reader="sidecar"), 1
+    )
+    results["XlsxExtractor(reader='sidecar'), reuse"] = time_call(
+        lambda: XlsxExtractor(args.filename, reader="sidecar"), args.repeat
+    )
+    remove_sidecar(args.filename)
+
+    baseline = results["read_excel, all columns"]
+
+    for name, seconds in results.items():
+        print(f"{name:<45} {seconds:>9.3f} s {baseline / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
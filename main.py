@@ -1,61 +1,329 @@
+from __future__ import annotations
+
+import argparse
 import os
-from src.code_generators import CodeCombiner
-from src.params_handler import ParamsCombiner
-from src.settings import get_logger
+from typing import TYPE_CHECKING, Iterable, Iterator
+from src.card_writer import CardWriter, OUTPUT_MODES, write_atomic
+from src.data_classes import PMMLCardExt
+from src.exporter import EXPORT_FORMATS
+from src.settings import configure_logging, get_logger, settings
+
+# Modules with processing are imported after arguments are parsed, so --help starts fast
+if TYPE_CHECKING:
+    from src.cache import ParseCache
+    from src.manifest import CardManifest
+    from src.params_handler import ParamsCombiner
 
 log = get_logger("main.log")
 
-def main():
+MANIFEST_NAME = ".manifest.json"
+BATCH_SUMMARY_NAME = "batch_summary.json"
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+PROFILE_HOOKS = ("cprofile", "pyinstrument")
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate OMDM, Blaze and report code for score cards.")
+    parser.add_argument("--no-cache", action="store_true", help="parse all input files without using the parse cache")
+    parser.add_argument("--clear-cache", action="store_true", help="remove all cached parse results before the run")
+    parser.add_argument("--incremental", action="store_true", help="write only cards which inputs changed and remove cards without pmml")
+    parser.add_argument("--recursive", action="store_true", help="look for input files in subdirectories too")
+    parser.add_argument("--workers", type=int, help="number of processes for parsing pmml files and generating code")
+    parser.add_argument("--watch", action="store_true", help="keep inputs parsed in memory and regenerate cards when input files change")
+    parser.add_argument("--stream", action="store_true", help="parse, generate and write cards one at a time to keep memory constant")
+    parser.add_argument("--output", choices=OUTPUT_MODES, default="files", help="write cards as separate files, one combined .md file or one archive")
+    parser.add_argument("--report-fields", choices=("standard", "advanced"), help="format of report fields in cards, 'standard' by default")
+    parser.add_argument("--report-start", type=int, help="first number of advanced report lines")
+    parser.add_argument("--result-info", action="store_true", help="also write one result_info.properties for all cards with one counter")
+    parser.add_argument("--export", nargs="+", choices=EXPORT_FORMATS, metavar="FORMAT", help="also write params and code of all cards to cards.jsonl and/or cards.parquet (needs pyarrow)")
+    parser.add_argument("--log-level", type=str.upper, choices=LOG_LEVELS, help="minimal level of logged messages, INFO by default")
+    parser.add_argument("--log-format", choices=("text", "json"), help="format of log records, 'json' writes one JSON object per line")
+    parser.add_argument("--fail-fast", action="store_true", help="check params of all cards first and stop without writing anything if any has problems")
+    parser.add_argument("--validation-report", metavar="FILE", help="save all problems of params to JSON file")
+    parser.add_argument("--profile", action="store_true", help="print time of every stage and counters of processed data")
+    parser.add_argument("--profile-json", metavar="FILE", help="save time of stages and counters to JSON file")
+    parser.add_argument("--profile-hook", choices=PROFILE_HOOKS, default="", help="run pipeline under cProfile or pyinstrument")
+    parser.add_argument("--serve", action="store_true", help="run local HTTP service generating code of cards sent in requests")
+    parser.add_argument("--host", help="host of the service, 127.0.0.1 by default")
+    parser.add_argument("--port", type=int, help="port of the service, 8765 by default")
+    parser.add_argument("--socket", metavar="PATH", help="serve on unix socket instead of TCP port")
+    parser.add_argument("--batch", nargs="+", metavar="DIR", help="process pmml files of many project directories with one xlsx and model.txt")
+    parser.add_argument("--xlsx", help="xlsx file for batch and service modes, found in working directory by default")
+    parser.add_argument("--model", help="model.txt file for batch and service modes, found in working directory by default")
+    parser.add_argument("--output-dir", help="directory for batch outputs, '<project>/cards' by default")
+
+    return parser.parse_args(argv)
+
+def main(argv: list = None) -> dict[str, str]:
+    """Run generation with command line arguments, return errors of pmml files which were not parsed."""
+
+    args = parse_args(argv)
+
+    configure_logging(level=args.log_level, log_format=args.log_format)
+
+    if args.recursive:
+        settings.RECURSIVE_SEARCH = True
+
+    if args.fail_fast:
+        settings.FAIL_FAST = True
+
+    if args.report_fields:
+        settings.REPORT_FIELDS_TYPE = args.report_fields
+
+    if args.report_start is not None:
+        settings.REPORT_LINE_START = args.report_start
+
+    if args.workers:
+        settings.PMML_WORKERS = args.workers
+        settings.CODE_WORKERS = args.workers
+
+    from src.profiler import profiler, run_with_hook
+
+    profiler.enabled = bool(args.profile or args.profile_json or args.profile_hook)
+
+    with profiler.stage("total"):
+        pmml_errors = run_with_hook(lambda: run(args), hook=args.profile_hook)
+
+    if args.profile:
+        print(profiler.format_summary())
+
+    if args.profile_json:
+        profiler.dump_json(args.profile_json)
+
+    return pmml_errors or {}
+
+def run(args: argparse.Namespace) -> dict[str, str]:
+    """Generate and write cards with options from command line, return errors of pmml files by file name."""
+
+    from src.cache import ParseCache
+    from src.code_generators import RESULT_INFO_NAME, CodeCombiner, ResultInfoReport
+    from src.exporter import CardExporter
+    from src.manifest import CardManifest
+    from src.params_handler import ParamsCombiner
 
     path = os.path.dirname(os.path.abspath(__file__))
-    log_dir = "log"
     cards_dir = "cards"
 
-    try:
-        os.mkdir(log_dir)
-    except Exception as e:
-        log.warning(e)
-        pass
+    cache = ParseCache(
+        directory=settings.CACHE_DIR,
+        max_size=settings.CACHE_MAX_SIZE,
+        enabled=not args.no_cache,
+        key_mode=settings.CACHE_KEY,
+    )
 
-    try:
-        os.mkdir(cards_dir)
-    except Exception as e:
-        log.warning(e)
-        pass
+    if args.clear_cache:
+        cache.clear()
+
+    if args.batch:
+        return run_batch(args, cache)
+
+    if args.serve:
+        run_service(args, cache)
+        return {}
+
+    if args.watch:
+        run_watch(args, cache, f"{path}/{cards_dir}")
+        return {}
 
     # Prepare for getting full code
-    params_combiner = ParamsCombiner()
-    full_cards_info = params_combiner.prepare_all_cards()
-    code_combiner = CodeCombiner(full_cards_info)
+    params_combiner = ParamsCombiner(cache=cache, stream=args.stream)
+
+    # All params are checked before anything is generated or written
+    if settings.FAIL_FAST or args.validation_report:
+        validate(params_combiner, args.validation_report)
+
+    # Streaming - every card goes through parse, resolve, generate and write before the next one is parsed
+    if args.stream:
+        full_cards_info = params_combiner.iter_cards()
+    else:
+        full_cards_info = params_combiner.prepare_all_cards()
+
+    writer = CardWriter(f"{path}/{cards_dir}", mode=args.output)
+    manifest = CardManifest(f"{path}/{cards_dir}/{MANIFEST_NAME}")
+
+    incremental = args.incremental
+    if incremental and writer.mode != "files":
+        log.warning(f"Incremental mode works only with separate files, all cards are written to '{writer.mode}' output.")
+        incremental = False
+
+    # Report includes all cards, unchanged ones too
+    if args.result_info:
+        result_info = ResultInfoReport(start=settings.REPORT_LINE_START)
+        full_cards_info = result_info.track(full_cards_info)
+
+    # Export includes all cards, unchanged ones are taken from the last export in incremental mode
+    exported = None
+    if args.export:
+        exporter = CardExporter(writer.output_dir, formats=args.export)
+        exported = set(exporter.load_previous()) if incremental else set()
+
+    score_names = set()
+    cards_to_write = select_cards(full_cards_info, manifest, writer, incremental, score_names, exported)
+
+    if args.export:
+        cards_to_write = exporter.track(cards_to_write)
+
+    code_combiner = CodeCombiner(workers=settings.CODE_WORKERS)
 
     # Get code for all cards and all systems
-    ready_code = code_combiner.get_code_for_all_cards()
-
-    for code in ready_code:
-        # Write code to 'score_card'.md file
-        with open(f"{path}/{cards_dir}/{code[0]}.md", "w") as f:
-            # Header
-            f.write(f"# {code[0]}\n\n")
-            # OMDM Code
-            f.write("## OMDM Code\n")
-            f.write("```js\n")
-            for line in code[1]["omdm"].code:
-                f.write(line)
-            f.write("```\n\n")
-
-            # Blaze code
-            f.write("## Blaze code\n")
-            f.write("```js\n")
-            for line in code[1]["blaze"].code:
-                f.write(line)
-            f.write("```\n\n")
-
-            # Report fields
-            f.write("## Report fields\n")
-            f.write("```js\n")
-            for line in code[1]["report"].code:
-                f.write(line)
-            f.write("```\n\n")
+    ready_code = code_combiner.iter_code(cards_to_write)
+
+    # Cards are exported on their way to writer
+    if args.export:
+        ready_code = exporter.export(ready_code, keep=score_names if incremental else None)
+
+    if writer.mode != "files":
+        writer.write_all(list(ready_code))
+    else:
+        # Write code to 'score_card'.md files while next cards are generated
+        filenames = writer.write_pipelined(ready_code, queue_size=settings.WRITE_QUEUE_SIZE)
+        log.info(f"{len(filenames)} cards were written.")
+
+        if incremental:
+            manifest.remove_missing(score_names)
+        else:
+            # Cards were written without fingerprints, the next incremental run writes all of them again
+            manifest.cards.clear()
+
+        manifest.save()
+
+    if args.result_info:
+        write_atomic(os.path.join(writer.output_dir, RESULT_INFO_NAME), result_info.get_code())
+        log.info(f"Report of all cards with {len(result_info.lines)} lines was written to '{RESULT_INFO_NAME}'.")
+
+    if params_combiner.issues:
+        log.warning(f"{len(params_combiner.issues)} params have problems, use --validation-report to get all of them.")
+
+    pmml_errors = params_combiner.pmml_data.errors
+
+    if pmml_errors:
+        log.error(f"{len(pmml_errors)} pmml files were not parsed, their cards were not written.")
+
+    return pmml_errors
+
+def validate(params_combiner: ParamsCombiner, report_file: str = "") -> None:
+    """Report problems of params of all cards, stop in fail-fast mode if there are any."""
+
+    report = params_combiner.validate()
+    report.log_issues()
+
+    if report_file:
+        report.write_json(report_file)
+
+    if settings.FAIL_FAST and report.issues:
+        log.fatal(f"Params have {len(report.issues)} problems, no cards were written.")
+        raise SystemExit(1)
+
+def run_watch(args: argparse.Namespace, cache: ParseCache, output_dir: str) -> None:
+    """Regenerate cards of working directory on every change of input files until interrupted."""
+
+    from src.watcher import ProjectWatcher
+
+    if args.output != "files" or args.stream:
+        log.warning("Watch mode writes separate files and updates only changed cards, other output options are ignored.")
+
+    watcher = ProjectWatcher(os.getcwd(), output_dir, manifest_name=MANIFEST_NAME, cache=cache)
+
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        log.info("Watching was stopped.")
+
+def get_shared_sources(args: argparse.Namespace) -> tuple[str, str]:
+    """Return xlsx and model.txt files from command line or working directory."""
+
+    from src.dir_handler import DirHandler
+
+    files = DirHandler(os.getcwd())
+    xlsx_file = args.xlsx or next(iter(files.xlsx_file), "")
+    model_file = args.model or next(iter(files.model_file), "")
+
+    if not xlsx_file or not model_file:
+        log.fatal("Batch and service modes need xlsx and model.txt files, use --xlsx and --model.")
+        raise SystemExit
+
+    return xlsx_file, model_file
+
+def run_service(args: argparse.Namespace, cache: ParseCache) -> None:
+    """Serve generation requests until interrupted."""
+
+    import asyncio
+
+    from src.params_handler import OMDMExtractor, XlsxExtractor
+    from src.service import GenerationService
+
+    xlsx_file, model_file = get_shared_sources(args)
+
+    service = GenerationService(
+        omdm_data=OMDMExtractor(model_file, cache=cache),
+        excel_data=XlsxExtractor(xlsx_file, cache=cache, reader=settings.XLSX_READER),
+        workers=args.workers or 1,
+    )
+
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        log.info("Service was stopped.")
+
+def run_batch(args: argparse.Namespace, cache: ParseCache) -> dict[str, str]:
+    """Generate cards for all project directories with shared xlsx and model.txt, return errors of pmml files."""
+
+    from src.batch import BatchRunner
+
+    xlsx_file, model_file = get_shared_sources(args)
+
+    output_root = args.output_dir or ""
+
+    runner = BatchRunner(
+        projects=args.batch,
+        xlsx_file=xlsx_file,
+        model_file=model_file,
+        output_root=output_root,
+        output_mode=args.output,
+        result_info=args.result_info,
+        workers=args.workers or 1,
+        cache=cache,
+    )
+    runner.run()
+    runner.write_summary(os.path.join(output_root or os.getcwd(), BATCH_SUMMARY_NAME))
+
+    return {pmml_file: error for result in runner.results for pmml_file, error in result.pmml_errors.items()}
+
+def select_cards(cards: Iterable[PMMLCardExt], manifest: CardManifest, writer: CardWriter, incremental: bool, score_names: set, exported: set = None) -> Iterator[PMMLCardExt]:
+    """
+    Yield cards to write, in incremental mode record them in manifest and skip unchanged cards.
+
+    exported: score names of cards in the last export when cards are exported, None otherwise;
+    unchanged cards which are missing from it or changed since it are yielded too
+    """
+
+    for card in cards:
+        score_names.add(card.score_name)
+
+        # Fingerprints are needed only to compare with the last run
+        if not incremental:
+            yield card
+            continue
+
+        fingerprint = manifest.get_fingerprint(card)
+        filename = writer.get_card_filename(card.score_name)
+
+        if not manifest.is_changed(card, fingerprint, filename) and is_exported(card, manifest, exported):
+            continue
+
+        manifest.update(card, fingerprint, filename, exported=exported is not None)
+        yield card
+
+    # Cards of pmml files which exist but were not parsed are kept, in export too
+    if incremental:
+        score_names.update(score_name for score_name, entry in manifest.cards.items() if os.path.exists(entry["source"]))
+
+def is_exported(card: PMMLCardExt, manifest: CardManifest, exported: set = None) -> bool:
+    """Check if the last export has current code of card, always True when cards are not exported."""
+
+    if exported is None:
+        return True
+
+    return card.score_name in exported and manifest.is_exported(card.score_name)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
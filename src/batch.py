@@ -0,0 +1,181 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from src.cache import ParseCache
+from src.card_writer import CardWriter, write_atomic
+from src.code_generators import RESULT_INFO_NAME, CodeCombiner, ResultInfoReport
+from src.params_handler import OMDMExtractor, ParamsCombiner, XlsxExtractor
+from src.settings import apply_settings, get_logger, get_settings_snapshot, settings
+
+
+log = get_logger("batch.log")
+
+# Extractors shared by all projects of a worker process
+shared_data = {}
+
+
+@dataclass
+class ProjectResult:
+    # Summary of one project directory
+    path: str
+    output_dir: str
+    cards: int = 0
+    seconds: float = 0.0
+    pmml_errors: dict[str, str] = field(default_factory=dict)
+    # Problems of params, see src.validation
+    param_issues: list[dict] = field(default_factory=list)
+    error: str = ""
+
+
+def init_shared_data(omdm_data: OMDMExtractor, excel_data: XlsxExtractor, settings_values: dict = None) -> None:
+    """Store extractors loaded once for all projects, settings_values - settings of the main process for worker process."""
+
+    if settings_values is not None:
+        apply_settings(settings_values)
+
+    shared_data["omdm"] = omdm_data
+    shared_data["excel"] = excel_data
+    # Params depend only on shared extractors, so they are resolved once for all projects
+    shared_data["resolved_params"] = {}
+    shared_data["issues"] = {}
+
+
+def run_project(path: str, output_dir: str, output_mode: str, cache: ParseCache = None, result_info: bool = False) -> ProjectResult:
+    """Generate and write cards for all pmml files of one project with shared extractors."""
+
+    start = time.perf_counter()
+    result = ProjectResult(path, output_dir)
+
+    try:
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Project directory '{path}' does not exist")
+
+        params_combiner = ParamsCombiner(
+            excel_data=shared_data["excel"],
+            omdm_data=shared_data["omdm"],
+            cache=cache,
+            resolved_params=shared_data["resolved_params"],
+            issues=shared_data["issues"],
+            path=path,
+        )
+
+        # Params are checked before anything is written
+        report = params_combiner.validate()
+        result.param_issues = [asdict(issue) for issue in report.issues]
+
+        if settings.FAIL_FAST and report.issues:
+            report.log_issues()
+            raise ValueError(f"Params have {len(report.issues)} problems, no cards were written")
+
+        cards = params_combiner.prepare_all_cards()
+
+        writer = CardWriter(output_dir, mode=output_mode)
+        writer.write_all(CodeCombiner(cards).get_code_for_all_cards())
+
+        if result_info:
+            report = ResultInfoReport(start=settings.REPORT_LINE_START)
+            for card in cards:
+                report.add_card(card)
+            write_atomic(os.path.join(output_dir, RESULT_INFO_NAME), report.get_code())
+
+        result.cards = len(cards)
+        result.pmml_errors = params_combiner.pmml_data.errors
+
+    except (Exception, SystemExit) as e:
+        result.error = f"{type(e).__name__}: {e}"
+        log.error(f"Project '{path}' failed - {result.error}")
+
+    result.seconds = round(time.perf_counter() - start, 3)
+
+    return result
+
+
+@dataclass
+class BatchRunner:
+    """Generates cards for many project directories with one shared xlsx and model.txt."""
+
+    projects: list[str]
+    xlsx_file: str
+    model_file: str
+    # Directory for project outputs: '<output_root>/<project>', '<project>/cards' if empty
+    output_root: str = ""
+    output_mode: str = "files"
+    # Write one result_info.properties for all cards of every project
+    result_info: bool = False
+    # Number of projects processed at the same time
+    workers: int = 1
+    cache: ParseCache = None
+    results: list[ProjectResult] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        # Shared sources are parsed only once for all projects
+        self.omdm_data = OMDMExtractor(self.model_file, cache=self.cache)
+        self.excel_data = XlsxExtractor(self.xlsx_file, cache=self.cache, reader=settings.XLSX_READER)
+
+    def get_output_dir(self, project: str) -> str:
+        if self.output_root:
+            return os.path.join(self.output_root, os.path.basename(os.path.normpath(project)))
+
+        return os.path.join(project, "cards")
+
+    def run(self) -> list[ProjectResult]:
+        """Process all projects, return results in order of projects."""
+
+        output_dirs = [self.get_output_dir(project) for project in self.projects]
+
+        if self.workers <= 1 or len(self.projects) <= 1:
+            init_shared_data(self.omdm_data, self.excel_data)
+            self.results = [
+                run_project(project, output_dir, self.output_mode, self.cache, self.result_info)
+                for project, output_dir in zip(self.projects, output_dirs)
+            ]
+            return self.results
+
+        # Projects are parallel, pmml files of one project are parsed in its worker process only
+        worker_settings = {**get_settings_snapshot(), "PMML_WORKERS": 1, "CODE_WORKERS": 1}
+
+        # Extractors are sent to every worker once, not with every project
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=init_shared_data,
+            initargs=(self.omdm_data, self.excel_data, worker_settings),
+        ) as executor:
+            self.results = list(executor.map(
+                run_project,
+                self.projects,
+                output_dirs,
+                [self.output_mode] * len(self.projects),
+                [self.cache] * len(self.projects),
+                [self.result_info] * len(self.projects),
+            ))
+
+        return self.results
+
+    def get_summary(self) -> dict:
+        return {
+            "xlsx_file": self.xlsx_file,
+            "model_file": self.model_file,
+            "projects": len(self.results),
+            "failed_projects": sum(1 for result in self.results if result.error),
+            "cards": sum(result.cards for result in self.results),
+            "pmml_errors": sum(len(result.pmml_errors) for result in self.results),
+            "param_issues": sum(len(result.param_issues) for result in self.results),
+            "results": [asdict(result) for result in self.results],
+        }
+
+    def write_summary(self, filename: str) -> None:
+        """Write summary report of all projects to JSON file and log it."""
+
+        summary = self.get_summary()
+
+        with open(filename, "w") as f:
+            json.dump(summary, f, indent=2)
+
+        for result in self.results:
+            status = f"FAILED - {result.error}" if result.error else "OK"
+            log.info(f"{result.path}: {result.cards} cards, {len(result.pmml_errors)} pmml errors, {result.seconds} s - {status}")
+
+        log.info(f"{summary['projects']} projects, {summary['cards']} cards, {summary['failed_projects']} failed. Summary: '{filename}'.")
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass, field
+
+from src.profiler import profiler
+from src.settings import get_logger
+
+
+log = get_logger("cache.log")
+
+# Change when parsers or cached classes change to drop old entries
+CACHE_VERSION = 4
+CHUNK_SIZE = 1024 * 1024
+
+
+def get_file_digest(filename: str) -> str:
+    """Return sha256 of file content."""
+
+    digest = hashlib.sha256()
+
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+@dataclass
+class ParseCache:
+    """Stores parsed input files on disk by file fingerprint."""
+
+    directory: str = ".cache"
+    # Size of all entries in bytes, the oldest used entries are removed above it
+    max_size: int = 256 * 1024 * 1024
+    enabled: bool = True
+    # How to fingerprint files:
+    # "content" - sha256 of file content
+    # "stat" - modification time and size of file
+    key_mode: str = "content"
+    hits: int = 0
+    misses: int = 0
+    # Computed keys by file and its modification time and size, changed files get a new key
+    keys: dict[tuple, str] = field(default_factory=dict)
+    # Size of all entries in bytes, directory is scanned only on the first put, -1 - not scanned yet
+    size: int = -1
+
+    def get_file_key(self, kind: str, filename: str, extra: str = "") -> str:
+        """Return key for file content and everything the parsed result depends on."""
+
+        stat = os.stat(filename)
+        memo_key = (kind, filename, extra, stat.st_mtime_ns, stat.st_size)
+
+        if memo_key in self.keys:
+            return self.keys[memo_key]
+
+        if self.key_mode == "stat":
+            file_key = f"{os.path.abspath(filename)}:{stat.st_mtime_ns}:{stat.st_size}"
+        else:
+            file_key = get_file_digest(filename)
+
+        key = hashlib.sha256(f"{CACHE_VERSION}:{kind}:{extra}:{file_key}".encode()).hexdigest()
+        self.keys[memo_key] = key
+
+        return key
+
+    def get_entry_path(self, kind: str, key: str) -> str:
+        return os.path.join(self.directory, f"{kind}-{key}.pickle")
+
+    def get(self, kind: str, filename: str, extra: str = ""):
+        """Return cached parse result for file or None."""
+
+        if not self.enabled:
+            return None
+
+        try:
+            entry = self.get_entry_path(kind, self.get_file_key(kind, filename, extra))
+
+            with open(entry, "rb") as f:
+                result = pickle.load(f)
+
+            # Mark entry as recently used for eviction
+            os.utime(entry)
+
+        except FileNotFoundError:
+            self.misses += 1
+            profiler.count("cache_misses")
+            return None
+
+        except Exception as e:
+            log.warning(f"Cache entry for '{filename}' was not loaded: {e}")
+            self.misses += 1
+            profiler.count("cache_misses")
+            return None
+
+        self.hits += 1
+        profiler.count("cache_hits")
+        log.debug("OK - '%s' was loaded from cache.", filename)
+
+        return result
+
+    def put(self, kind: str, filename: str, value, extra: str = "") -> None:
+        """Store parse result for file."""
+
+        if not self.enabled:
+            return
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            entry = self.get_entry_path(kind, self.get_file_key(kind, filename, extra))
+
+            # Write to temporary file first so readers never see half written entry
+            tmp_entry = f"{entry}.{os.getpid()}.tmp"
+            with open(tmp_entry, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_entry, entry)
+
+            if self.size < 0:
+                self.size = sum(entry.stat().st_size for entry in self.get_entries())
+            else:
+                self.size += os.path.getsize(entry)
+
+        except Exception as e:
+            log.warning(f"Parse result of '{filename}' was not cached: {e}")
+            return
+
+        # Directory is scanned again only when entries do not fit
+        if self.size > self.max_size:
+            self.evict()
+
+    def get_entries(self) -> list[os.DirEntry]:
+        try:
+            return [entry for entry in os.scandir(self.directory) if entry.name.endswith(".pickle")]
+        except FileNotFoundError:
+            return []
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until cache fits max_size."""
+
+        entries = sorted(self.get_entries(), key=lambda entry: entry.stat().st_mtime)
+        total_size = sum(entry.stat().st_size for entry in entries)
+
+        for entry in entries:
+            if total_size <= self.max_size:
+                break
+
+            total_size -= entry.stat().st_size
+            os.remove(entry.path)
+            log.debug("Cache entry '%s' was evicted.", entry.name)
+
+        self.size = total_size
+
+    def clear(self) -> None:
+        """Remove all entries."""
+
+        for entry in self.get_entries():
+            os.remove(entry.path)
+
+        self.size = 0
+        log.info(f"Cache '{self.directory}' was cleared.")
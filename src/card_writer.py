@@ -0,0 +1,180 @@
+import io
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from src.profiler import profiled, profiler
+from src.settings import get_logger
+from src.templates import templates
+
+
+log = get_logger("card_writer.log")
+
+# Card sections: title in .md file and system in generated code
+SECTIONS = (
+    ("OMDM Code", "omdm"),
+    ("Blaze code", "blaze"),
+    ("Report fields", "report"),
+)
+
+OUTPUT_MODES = ("files", "combined", "tar", "zip")
+
+
+def render_card(score_name: str, code: dict) -> str:
+    """Return full .md text of one card."""
+
+    parts = [f"# {score_name}\n\n"]
+
+    # Sections registered in templates follow the standard ones
+    for title, system in (*SECTIONS, *((title, target) for target, title in templates.sections.items())):
+        parts.append(f"## {title}\n```js\n")
+        parts.append(code[system].code)
+        parts.append("```\n\n")
+
+    return "".join(parts)
+
+
+def write_atomic(filename: str, data) -> None:
+    """Write text or bytes to temporary file and move it in place, readers never see a half written file."""
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    tmp_filename = os.path.join(directory, f".{os.path.basename(filename)}.{os.getpid()}.tmp")
+    mode = "wb" if isinstance(data, bytes) else "w"
+
+    try:
+        with open(tmp_filename, mode) as f:
+            f.write(data)
+        os.replace(tmp_filename, filename)
+
+    except Exception:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+
+
+@dataclass
+class CardWriter:
+    """Writes generated code of cards to output directory."""
+
+    output_dir: str
+    # How to write cards:
+    # "files" - one 'score_card'.md file per card
+    # "combined" - all cards in one .md file
+    # "tar", "zip" - one archive with 'score_card'.md files
+    mode: str = "files"
+    bundle_name: str = "cards"
+    written: list[str] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if self.mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode '{self.mode}', use one of {OUTPUT_MODES}.")
+
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def get_card_filename(self, score_name: str) -> str:
+        return os.path.join(self.output_dir, f"{score_name}.md")
+
+    def get_bundle_filename(self) -> str:
+        extension = "md" if self.mode == "combined" else self.mode
+        return os.path.join(self.output_dir, f"{self.bundle_name}.{extension}")
+
+    @profiled("CardWriter")
+    def write_card(self, score_name: str, code: dict) -> str:
+        """Write one card to 'score_card'.md file, return file name."""
+
+        filename = self.get_card_filename(score_name)
+        write_atomic(filename, render_card(score_name, code))
+        self.written.append(filename)
+        profiler.count("cards_written")
+
+        return filename
+
+    def write_all(self, ready_code: list[list]) -> list[str]:
+        """Write all cards in selected mode, return written files."""
+
+        if self.mode == "files":
+            return [self.write_card(score_name, code) for score_name, code in ready_code]
+
+        with profiler.stage("CardWriter"):
+            if self.mode == "combined":
+                data = "".join(render_card(score_name, code) for score_name, code in ready_code)
+            else:
+                data = self.get_archive(ready_code)
+
+            filename = self.get_bundle_filename()
+            write_atomic(filename, data)
+            self.written.append(filename)
+            profiler.count("cards_written", len(ready_code))
+
+        return [filename]
+
+    def write_pipelined(self, ready_code: Iterable[list], queue_size: int = 32) -> list[str]:
+        """
+        Write cards in a separate thread while next cards are generated.
+
+        Cards are written in the order they come, return written files in the same order.
+        """
+
+        cards_queue = queue.Queue(maxsize=queue_size)
+        filenames = []
+        errors = []
+
+        def write_from_queue() -> None:
+            while True:
+                item = cards_queue.get()
+
+                if item is None:
+                    return
+
+                # Keep draining the queue after error, so generation is not blocked
+                if errors:
+                    continue
+
+                try:
+                    filenames.append(self.write_card(*item))
+                except Exception as e:
+                    errors.append(e)
+
+        writer_thread = threading.Thread(target=write_from_queue, name="card-writer")
+        writer_thread.start()
+
+        try:
+            for score_name, code in ready_code:
+                cards_queue.put((score_name, code))
+        finally:
+            cards_queue.put(None)
+            writer_thread.join()
+
+        if errors:
+            raise errors[0]
+
+        return filenames
+
+    def get_archive(self, ready_code: list[list]) -> bytes:
+        """Return tar or zip archive with 'score_card'.md file for every card."""
+
+        import tarfile
+        import zipfile
+
+        buffer = io.BytesIO()
+
+        if self.mode == "zip":
+            with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                for score_name, code in ready_code:
+                    archive.writestr(f"{score_name}.md", render_card(score_name, code))
+
+        else:
+            now = time.time()
+            with tarfile.open(fileobj=buffer, mode="w") as archive:
+                for score_name, code in ready_code:
+                    data = render_card(score_name, code).encode()
+
+                    info = tarfile.TarInfo(f"{score_name}.md")
+                    info.size = len(data)
+                    info.mtime = now
+                    archive.addfile(info, io.BytesIO(data))
+
+        return buffer.getvalue()
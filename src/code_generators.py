@@ -1,19 +1,28 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass, field
+from typing import Iterable, Iterator
 
-from src.settings import get_logger
+from src.settings import apply_settings, get_logger, get_settings_snapshot, settings
 from src.data_classes import FullParam, PMMLCardExt
+from src.profiler import profiled, profiler
+from src.templates import templates
 
 log = get_logger("code_generators.log")
 
+# Report with XPATH of all cards for NSTM config
+RESULT_INFO_NAME = "result_info.properties"
 
-@dataclass
+
+@dataclass(slots=True)
 class CodeMixin:
     score_card_name: str = field(default_factory=str)
     params: list[FullParam] = field(default_factory=list)
-    code: list = field(default_factory=list)
+    # Generated code joined into one string
+    code: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class OMDMCode(CodeMixin):
     """Class for generating code for method in OMDM."""
 
@@ -21,65 +30,27 @@ class OMDMCode(CodeMixin):
         # Fill class properties with ready code on creation
         self.set_omdm_code()
 
-    def get_logic_code(self, param: FullParam) -> list[str]:
-        """Generate code with apppropriate methods and conditions."""
-
-        if param._type == "decimal":
-            # Code for numeric params
-            result = [
-                f'xScoreInput.{param.name} := dmi_App_Get_ScoreVariableValue("#{param.name}");\n',
-                f'if(xScoreInput.{param.name} = -99999) then\n',
-                f'    xScoreInput.{param.name} = {param.method};\n',
-                f'endif\n',
-            ]
-        
-        if param._type == "string":
-            # Code for string params
-            result = [
-                f'xScoreInput.{param.name} := dms_App_Get_NumToStr(dmi_App_Get_ScoreVariableValue("#{param.name}"));\n',
-                f'if(xScoreInput.{param.name} = "-99999") then\n',
-                f'    xScoreInput.{param.name} = dms_App_Get_NumToStr({param.method});\n',
-                f'endif\n',
-            ]
-        
-        return result
-
-    def get_logging_code(self, param: FullParam) -> list[str]:
-        """Generate code to log params to certain structure."""
-
-        if param._type == "decimal":
-            result = [f'dmw_App_AddScoreCardVariablesParam2CDA("{param.name}", xScoreInput.{param.name});\n',]
-
-        if param._type == "string":
-            result = [f'dmw_App_AddScoreCardVariablesParam2CDA("{param.name}", Val(xScoreInput.{param.name}));\n',]
-
-        return result
-
     def get_omdm_logic(self) -> list[str]:
         """Generate code with logic for all params provided."""
-        result = []
 
-        for param in self.params:
-            result += self.get_logic_code(param=param)
-
-        return result
+        return templates.render_lines("omdm_logic", self.params)
 
     def get_omdm_logging(self) -> list[str]:
         """Generate code with logging results for all params provided."""
-        result = []
-
-        for param in self.params:
-            result += self.get_logging_code(param=param)
 
-        return result
+        return templates.render_lines("omdm_logging", self.params)
 
     def set_omdm_code(self) -> None:
-        self.code += self.get_omdm_logic()
-        self.code += "\n"
-        self.code += self.get_omdm_logging()
+        result = []
 
+        result += self.get_omdm_logic()
+        result += "\n"
+        result += self.get_omdm_logging()
 
-@dataclass
+        self.code = "".join(result)
+
+
+@dataclass(slots=True)
 class BLAZECode(CodeMixin):
     """Class for generating code for BLAZE."""
 
@@ -97,30 +68,10 @@ class BLAZECode(CodeMixin):
         
         return result
 
-    def get_param_line(self, param: FullParam) -> list[str]:
-        """Generate code for one param."""
-
-        if param._type == "decimal":
-            result = [
-                f"\t_{self.score_card_name}In.{param.pmml_name} = theApp.CDA_NdScoreModel.Cda_NdScoreModelInputInfo.{param.name};\n",
-            ]
-
-        if param._type == "string":
-            result = [
-                f"\t_{self.score_card_name}In.{param.pmml_name} = portable().toInteger(theApp.CDA_NdScoreModel.Cda_NdScoreModelInputInfo.{param.name});\n",
-            ]
-
-        return result
-
     def get_params_lines(self) -> list[str]:
         """Generate code for all params provided."""
 
-        result = []
-
-        for param in self.params:
-            result += self.get_param_line(param)
-        
-        return result
+        return templates.render_lines("blaze_param", self.params, self.score_card_name)
 
     def get_last_lines(self) -> list[str]:
         """Generate closing code."""
@@ -141,10 +92,10 @@ class BLAZECode(CodeMixin):
         result += self.get_params_lines()
         result += self.get_last_lines()
 
-        self.code = result
+        self.code = "".join(result)
 
 
-@dataclass
+@dataclass(slots=True)
 class ReportFields(CodeMixin):
     """Class for generating XPATH for each required param to use in testing."""
 
@@ -152,68 +103,119 @@ class ReportFields(CodeMixin):
     start: int = 0
 
     def __post_init__(self) -> None:
+        result = []
+
         if self.fields_type == "standard":
-            self.set_standard_report()
+            result = self.get_standard_report()
 
         if self.fields_type == "advanced":
-            self.set_advanced_report()
-            self.add_counter_to_report_line()
+            result = self.add_counter_to_report_line(self.get_advanced_report())
+
+        self.code = "".join(result)
 
-    def add_counter_to_report_line(self) -> None:
+    def add_counter_to_report_line(self, lines: list[str]) -> list[str]:
         """Adds a number at the end of XPATH to use in 'result_info.properties' directly."""
 
         result = []
 
-        for line in self.code:
+        for line in lines:
             line = line + f";1;1;1;{self.start}\n"
             result.append(line)
             self.start += 1
 
-        self.code = result
+        return result
 
-    def set_standard_report(self) -> None:
+    def get_standard_report(self) -> list[str]:
         """Generates XPATH for all params to insert into testing app by hand."""
 
+        result = []
+
         start = [
             f"/Application/CDA[@CDAISACTIVE='Active']/CDAScore[@CDASCRNAME='{self.score_card_name}']/@CDASCRNAME\n",
             f"/Application/CDA[@CDAISACTIVE='Active']/@CDADATE\n",
             f"/Application/ServiceCall/SCBurRes/SCSINGLE_FORMAT/@SCSFGROUPID\n",
         ]
 
-        self.code += start
+        result += start
+        result += templates.render_lines("report_standard", self.params, self.score_card_name)
 
-        for param in self.params:
-            self.code.append(f"/Application/CDA[@CDAISACTIVE='Active']/CDAScore/CDAScoreParam[@CDASPNAME='{param.name}']/@CDASPVALUE\n")
-            
         end = [
             f"/Application/ApplicationScoring/ScoreModelOutput[@ScoreModelName='{self.score_card_name}']/@FinalScore\n",
             f"/Application/CDA[@CDAISACTIVE='Active']/CDAScore[@CDASCRNAME='{self.score_card_name}']/CDAScoreParam[@CDASPNAME='Prediction_proba']/@CDASPVALUE\n",
             f"/Application/CDA[@CDAISACTIVE='Active']/CDAScore[@CDASCRNAME='{self.score_card_name}']/CDAScoreParam[@CDASPNAME='Calibrated_Score']/@CDASPVALUE\n",
         ]
 
-        self.code += end
+        result += end
+
+        return result
+
+    def get_advanced_report(self) -> list[str]:
+        """
+        Generates XPATH for all params to insert into 'result_info.properties'.
+
+        Keys of card lines end with score card name, so lines of many cards can be in one file.
+        """
 
-    def set_advanced_report(self) -> None:
-        """Generates XPATH for all params to insert into 'result_info.properties'."""
+        result = []
 
         start = [
-            f"\#ScoreCard=/Application/CDA[@CDAISACTIVE='Active']/CDAScore[@CDASCRNAME='{self.score_card_name}']/@CDASCRNAME",
-            f"\#CDADATE=/Application/CDA[@CDAISACTIVE='Active']/@CDADATE",
-            f"\#SCSFGROUPID=/Application/ServiceCall/SCBurRes/SCSINGLE_FORMAT/@SCSFGROUPID",
+            f"\\#ScoreCard_{self.score_card_name}=/Application/CDA[@CDAISACTIVE='Active']/CDAScore[@CDASCRNAME='{self.score_card_name}']/@CDASCRNAME",
+            f"\\#CDADATE=/Application/CDA[@CDAISACTIVE='Active']/@CDADATE",
+            f"\\#SCSFGROUPID=/Application/ServiceCall/SCBurRes/SCSINGLE_FORMAT/@SCSFGROUPID",
         ]
 
-        self.code += start
+        result += start
+        result += templates.render_lines("report_advanced", self.params, self.score_card_name)
 
-        for param in self.params:
-            self.code.append(f"\#{param.name}=/Application/CDA[@CDAISACTIVE='Active']/CDAScore/CDAScoreParam[@CDASPNAME='{param.name}']/@CDASPVALUE")
-            
         end = [
-            f"\#FinalScore=/Application/ApplicationScoring/ScoreModelOutput[@ScoreModelName='{self.score_card_name}']/@FinalScore",
-            f"\#CDASPVALUE/Application/CDA[@CDAISACTIVE='Active']/CDAScore[@CDASCRNAME='{self.score_card_name}']/CDAScoreParam[@CDASPNAME='Prediction_proba']/@CDASPVALUE",
-            f"\#CDASPVALUE/Application/CDA[@CDAISACTIVE='Active']/CDAScore[@CDASCRNAME='{self.score_card_name}']/CDAScoreParam[@CDASPNAME='Calibrated_Score']/@CDASPVALUE",
+            f"\\#FinalScore_{self.score_card_name}=/Application/ApplicationScoring/ScoreModelOutput[@ScoreModelName='{self.score_card_name}']/@FinalScore",
+            f"\\#Prediction_proba_{self.score_card_name}=/Application/CDA[@CDAISACTIVE='Active']/CDAScore[@CDASCRNAME='{self.score_card_name}']/CDAScoreParam[@CDASPNAME='Prediction_proba']/@CDASPVALUE",
+            f"\\#Calibrated_Score_{self.score_card_name}=/Application/CDA[@CDAISACTIVE='Active']/CDAScore[@CDASCRNAME='{self.score_card_name}']/CDAScoreParam[@CDASPNAME='Calibrated_Score']/@CDASPVALUE",
         ]
 
-        self.code += end
+        result += end
+
+        return result
+
+
+@dataclass
+class ResultInfoReport:
+    """Advanced report of all cards with one counter, every XPATH is written once and every key is unique."""
+
+    start: int = settings.REPORT_LINE_START
+    # Lines without counter in order of cards, shared lines (dates, params) are kept once
+    lines: dict[str, None] = field(default_factory=dict)
+
+    def add_card(self, card: PMMLCardExt) -> None:
+        for line in ReportFields(card.score_name, card.params).get_advanced_report():
+            self.lines.setdefault(line)
+
+    def track(self, cards: Iterable[PMMLCardExt]) -> Iterator[PMMLCardExt]:
+        """Pass cards through and add every card to report."""
+
+        for card in cards:
+            self.add_card(card)
+            yield card
+
+    def get_code(self) -> str:
+        return "".join(ReportFields(start=self.start).add_counter_to_report_line(list(self.lines)))
+
+
+@dataclass(slots=True)
+class TemplateCode(CodeMixin):
+    """Class for generating code of section registered in templates."""
+
+    target: str = field(default_factory=str)
+
+    def __post_init__(self) -> None:
+        # Params without template of this section are only left out of it
+        self.code = templates.render(self.target, self.params, self.score_card_name, skip_missing=True)
+
+
+def generate_card_code(card: PMMLCardExt) -> list:
+    """Generate code for all systems for one card in a worker process."""
+
+    return [card.score_name, CodeCombiner().get_code_for_card(card)]
 
 
 @dataclass
@@ -221,7 +223,10 @@ class CodeCombiner():
     """Generates full code for all systems for each card provided."""
 
     score_card_list: list[PMMLCardExt] = field(default_factory=list)
+    # Number of processes to generate code with, 1 - generate in current process
+    workers: int = 1
 
+    @profiled("CodeCombiner")
     def get_code_for_card(self, card: PMMLCardExt) -> dict:
         """Generate code for all systems for one card."""
 
@@ -229,18 +234,59 @@ class CodeCombiner():
 
         result["omdm"] = OMDMCode(card.score_name, card.params)
         result["blaze"] = BLAZECode(card.score_name, card.params)
-        result["report"] = ReportFields(card.score_name, card.params, fields_type="standard")
+        result["report"] = ReportFields(card.score_name, card.params, fields_type=settings.REPORT_FIELDS_TYPE, start=settings.REPORT_LINE_START)
+
+        for target in templates.sections:
+            result[target] = TemplateCode(card.score_name, card.params, target=target)
 
         return result
 
     def get_code_for_all_cards(self) -> list[list]:
         """Generate code for all systems for all cards provided."""
 
-        result = []
-        for card_ext in self.score_card_list:
-            result.append([card_ext.score_name ,self.get_code_for_card(card_ext)])
+        return list(self.iter_code_for_all_cards())
 
-        return result
+    def iter_code_for_all_cards(self) -> Iterator[list]:
+        """Yield code for every card in order of score_card_list."""
+
+        return self.iter_code(self.score_card_list)
+
+    def iter_code(self, cards: Iterable[PMMLCardExt]) -> Iterator[list]:
+        """
+        Yield code for every card in order of cards:
+        ['INC00_NAME', {'omdm': OMDMCode, 'blaze': BLAZECode, 'report': ReportFields}]
+
+        Cards are taken from iterable only when workers are ready for them.
+        """
+
+        if self.workers <= 1:
+            for card_ext in cards:
+                yield [card_ext.score_name, self.get_code_for_card(card_ext)]
+            return
+
+        # Settings changed at runtime are not inherited by spawned workers
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=apply_settings,
+            initargs=(get_settings_snapshot(),),
+        ) as executor:
+            pending = deque()
+
+            for card_ext in cards:
+                pending.append(executor.submit(generate_card_code, card_ext))
+
+                # Keep a few cards per worker in flight
+                if len(pending) >= self.workers * 4:
+                    yield self.get_result(pending.popleft())
+
+            while pending:
+                yield self.get_result(pending.popleft())
+
+    def get_result(self, future: Future) -> list:
+        """Wait for code generated by worker process."""
+
+        with profiler.stage("CodeCombiner (waiting for workers)"):
+            return future.result()
 
 
 def get_code_examples():
@@ -272,8 +318,7 @@ def get_code_examples():
     oc = OMDMCode(params=params)
     with open("code_examples/omdm_example.md", "w") as f:
         f.write("```js\n")
-        for line in oc.code:
-            f.write(line)
+        f.write(oc.code)
         f.write("```\n")
 
     # Blaze Code
@@ -285,8 +330,7 @@ def get_code_examples():
     bc = BLAZECode(**blaze_params)
     with open("code_examples/blaze_example.md", "w") as f:
         f.write("```js\n")
-        for line in bc.code:
-            f.write(line)
+        f.write(bc.code)
         f.write("```\n")
 
     # Report fields
@@ -300,8 +344,7 @@ def get_code_examples():
     rf_st = ReportFields(**p_standard)
     with open("code_examples/report_fields_standard.md", "w") as f:
         f.write("```js\n")
-        for line in rf_st.code:
-            f.write(line)
+        f.write(rf_st.code)
         f.write("```\n")
 
     # Advanced report fields to put into NSTM config file
@@ -314,8 +357,7 @@ def get_code_examples():
     rf_adv = ReportFields(**p_advanced)
     with open("code_examples/report_fields_advanced.md", "w") as f:
         f.write("```js\n")
-        for line in rf_adv.code:
-            f.write(line)
+        f.write(rf_adv.code)
         f.write("```\n")
 
 if __name__ == "__main__":
@@ -1,20 +1,23 @@
 from dataclasses import dataclass, field
 
 
-@dataclass
+# Params are shared between cards and created in large numbers, so classes are slotted
+# and params are frozen to be safely reused
+
+@dataclass(frozen=True, slots=True)
 class OMDMParam:
     # Basic OMDM param from parsing model.txt
     name: str
     _type: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ExcelParam:
     name: list = field(default_factory=list)
     method: list = field(default_factory=list)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FullParam(OMDMParam):
     # Extended OMDM param with name in card and method in xlsx
     pmml_name: str
@@ -24,19 +27,22 @@ class FullParam(OMDMParam):
 @dataclass
 class Files:
     # Stores files for use
-    xlsx: str
-    txt: str
-    pmml: list
+    xlsx: list[str] = field(default_factory=list)
+    txt: list[str] = field(default_factory=list)
+    pmml: list[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class PMMLCard:
     # Needed info from pmml score card
     score_name: str
     params: list[str] = field(default_factory=list)
+    # File the card was parsed from
+    source: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class PMMLCardExt:
     score_name: str
     params: list[FullParam] = field(default_factory=list)
+    source: str = ""
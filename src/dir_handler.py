@@ -1,72 +1,89 @@
+import fnmatch
 import os
 from dataclasses import dataclass, field
 
 from src.settings import get_logger
 from src.data_classes import Files
+from src.profiler import profiled, profiler
 
 
 log = get_logger("dir_handler.log")
 
+# Glob pattern for every kind of input file
+DEFAULT_PATTERNS = {
+    "xlsx": "*.xlsx",
+    "txt": "*.txt",
+    "pmml": "*.pmml",
+}
+
+# Files and directories which are never inputs
+EXCLUDED_NAMES = ("requirements.txt", "log", "cards", "__pycache__")
+
 
 @dataclass
 class DirHandler():
 
     path: str
-    xlsx_file: str = ""
-    model_file: str = ""
+    xlsx_file: list = field(default_factory=list)
+    model_file: list = field(default_factory=list)
     pmml_files: list = field(default_factory=list)
+    # Look for files in subdirectories too
+    recursive: bool = False
+    patterns: dict[str, str] = field(default_factory=lambda: dict(DEFAULT_PATTERNS))
 
     def __post_init__(self) -> None:
         if not self.path:
             log.fatal("Empty path!")
             raise SystemExit
         else:
-            self.xlsx_file = self.get_sorted_files()["xlsx"]
-            self.model_file = self.get_sorted_files()["txt"]
-            self.pmml_files = self.get_sorted_files()["pmml"]
+            files = self.get_sorted_files()
 
-    def get_dir_list(self) -> list:
+            self.xlsx_file = files.xlsx
+            self.model_file = files.txt
+            self.pmml_files = files.pmml
 
-        exception = "requirements.txt"
+    def scan_dir(self, path: str) -> list[str]:
+        """Return paths of all files in path, with subdirectories if recursive."""
+
+        result = []
 
         try:
-            listdir = os.listdir(self.path)
+            entries = list(os.scandir(path))
         except Exception as e:
             log.fatal(e)
+            return result
 
-        if exception in listdir:
-            listdir.remove(exception)
-
-        return listdir
+        for entry in entries:
+            if entry.name in EXCLUDED_NAMES or entry.name.startswith("."):
+                continue
 
-    def get_files_with_extension(self, extension: str) -> list:
-        """
-        Return list with full file names:
-        ['test.pmml', 'test2.pmml']
-        """
+            if entry.is_file():
+                result.append(entry.path)
 
-        result = []
-
-        for _file in self.get_dir_list():
-            f = os.path.splitext(_file)
-            if f[1] == extension:
-                result.append(f"{f[0]}{f[1]}")
+            elif self.recursive and entry.is_dir(follow_symlinks=False):
+                result += self.scan_dir(entry.path)
 
         return result
 
+    @profiled("DirHandler")
     def get_sorted_files(self) -> Files:
         """
-        Return object Files {
-            'xlsx': 'test.xlsx', 
-            'pmml': ['test.pmml', 'test2.pmml'], 
-            'txt': 'model.txt'
+        Scan path once and return object Files {
+            'xlsx': ['/path/test.xlsx'],
+            'pmml': ['/path/test.pmml', '/path/test2.pmml'],
+            'txt': ['/path/model.txt']
             }
         """
 
-        files = {}
+        files = Files()
+
+        for filename in sorted(self.scan_dir(self.path)):
+            name = os.path.basename(filename)
 
-        files["xlsx"] = self.get_files_with_extension(".xlsx")
-        files["pmml"] = self.get_files_with_extension(".pmml")
-        files["txt"] = self.get_files_with_extension(".txt")
+            for kind, pattern in self.patterns.items():
+                if fnmatch.fnmatch(name, pattern):
+                    getattr(files, kind).append(filename)
+                    profiler.count("files_found")
+                    break
 
         return files
@@ -0,0 +1,206 @@
+import json
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from src.data_classes import PMMLCardExt
+from src.profiler import profiler
+from src.settings import get_logger
+
+
+log = get_logger("exporter.log")
+
+EXPORT_FORMATS = ("jsonl", "parquet")
+
+
+def get_methods(method) -> list[str]:
+    """Return methods of param as list: 'dmi_A' -> ['dmi_A'], missing method -> []."""
+
+    methods = method if isinstance(method, list) else [method]
+
+    # Empty cells of excel are NaN
+    return [str(value) for value in methods if value is not None and value == value]
+
+
+def get_card_record(card: PMMLCardExt, code: dict) -> dict:
+    """
+    Return card with params and generated code as dict:
+    {
+        'score_name': 'INC00_NAME',
+        'source': '/path/test.pmml',
+        'params': [{'name': 'Param_1', 'type': 'decimal', 'pmml_name': 'PARAM_1', 'methods': ['dmi_App_Get_PARAM_1']}],
+        'code': {'omdm': '...', 'blaze': '...', 'report': '...'},
+    }
+    """
+
+    return {
+        "score_name": card.score_name,
+        "source": card.source,
+        "params": [
+            {"name": param.name, "type": param._type, "pmml_name": param.pmml_name, "methods": get_methods(param.method)}
+            for param in card.params
+        ],
+        "code": {system: generated.code for system, generated in code.items()},
+    }
+
+
+def write_parquet(filename: str, records: list[dict]) -> None:
+    """Write records to Parquet file with pyarrow (optional dependency)."""
+
+    import pyarrow
+    import pyarrow.parquet
+
+    param_type = pyarrow.struct([
+        ("name", pyarrow.string()),
+        ("type", pyarrow.string()),
+        ("pmml_name", pyarrow.string()),
+        ("methods", pyarrow.list_(pyarrow.string())),
+    ])
+    schema = pyarrow.schema([
+        ("score_name", pyarrow.string()),
+        ("source", pyarrow.string()),
+        ("params", pyarrow.list_(param_type)),
+        ("code", pyarrow.map_(pyarrow.string(), pyarrow.string())),
+    ])
+
+    # Map column is built from list of pairs
+    rows = [{**record, "code": list(record["code"].items())} for record in records]
+
+    pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows, schema=schema), filename)
+
+
+def read_jsonl(filename: str) -> Iterator[dict]:
+    with open(filename, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_parquet(filename: str) -> Iterator[dict]:
+    """Read records written by write_parquet with pyarrow (optional dependency)."""
+
+    import pyarrow.parquet
+
+    for row in pyarrow.parquet.read_table(filename).to_pylist():
+        yield {**row, "code": dict(row["code"])}
+
+
+@dataclass
+class CardExporter:
+    """Exports params and generated code of every card to JSON Lines and Parquet files next to cards."""
+
+    output_dir: str
+    formats: list[str] = field(default_factory=lambda: ["jsonl"])
+    name: str = "cards"
+    # Cards waiting for their code, code comes in the same order
+    cards: deque[PMMLCardExt] = field(default_factory=deque)
+    exported: list[str] = field(default_factory=list)
+    # Records of the last export by score name, unchanged cards are taken from it in incremental mode
+    previous: dict[str, dict] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        unknown = set(self.formats) - set(EXPORT_FORMATS)
+
+        if unknown:
+            raise ValueError(f"Unknown export formats {sorted(unknown)}, use {EXPORT_FORMATS}.")
+
+        if "parquet" in self.formats:
+            try:
+                import pyarrow
+            except ImportError:
+                log.error("pyarrow is not installed, cards are not exported to Parquet.")
+                self.formats = [export_format for export_format in self.formats if export_format != "parquet"]
+
+    def get_filename(self, export_format: str) -> str:
+        return os.path.join(self.output_dir, f"{self.name}.{export_format}")
+
+    def load_previous(self) -> dict[str, dict]:
+        """Load records of the last export, JSON Lines is preferred, nothing is loaded if files are missing."""
+
+        readers = {"jsonl": read_jsonl, "parquet": read_parquet}
+
+        for export_format in self.formats:
+            filename = self.get_filename(export_format)
+
+            if not os.path.exists(filename):
+                continue
+
+            try:
+                self.previous = {record["score_name"]: record for record in readers[export_format](filename)}
+                break
+            except Exception as e:
+                log.warning(f"Export '{filename}' was not loaded, its cards are exported again: {e}")
+
+        return self.previous
+
+    def track(self, cards: Iterable[PMMLCardExt]) -> Iterator[PMMLCardExt]:
+        """Pass cards through and keep them until their code is exported."""
+
+        for card in cards:
+            self.cards.append(card)
+            yield card
+
+    def export(self, ready_code: Iterable[list], keep: set[str] = None) -> Iterator[list]:
+        """
+        Pass generated code through and write every card to JSON Lines as it comes.
+
+        keep: score names of cards whose records of the last export are written again if their code is not generated
+        Files are replaced only when all cards are exported, Parquet is written at the end.
+        """
+
+        records = []
+        count = 0
+        generated = set()
+        jsonl_filename = self.get_filename("jsonl")
+        tmp_filename = f"{jsonl_filename}.{os.getpid()}.tmp"
+        jsonl = open(tmp_filename, "w") if "jsonl" in self.formats else None
+        done = False
+
+        try:
+            for score_name, code in ready_code:
+                with profiler.stage("CardExporter"):
+                    record = get_card_record(self.cards.popleft(), code)
+                    generated.add(score_name)
+                    self.add_record(record, jsonl, records)
+
+                count += 1
+                yield [score_name, code]
+
+            # Unchanged cards, score names are known only when all cards are selected
+            if keep is not None:
+                with profiler.stage("CardExporter"):
+                    for score_name, record in self.previous.items():
+                        if score_name in keep and score_name not in generated:
+                            self.add_record(record, jsonl, records)
+                            count += 1
+
+            done = True
+
+        finally:
+            if jsonl is not None:
+                jsonl.close()
+
+                if done:
+                    os.replace(tmp_filename, jsonl_filename)
+                    self.exported.append(jsonl_filename)
+                else:
+                    os.remove(tmp_filename)
+
+        if "parquet" in self.formats:
+            with profiler.stage("CardExporter"):
+                parquet_filename = self.get_filename("parquet")
+                write_parquet(f"{parquet_filename}.tmp", records)
+                os.replace(f"{parquet_filename}.tmp", parquet_filename)
+                self.exported.append(parquet_filename)
+
+        if self.exported:
+            log.info(f"{count} cards were exported to {', '.join(self.exported)}.")
+
+    def add_record(self, record: dict, jsonl, records: list[dict]) -> None:
+        if jsonl is not None:
+            jsonl.write(json.dumps(record, ensure_ascii=False))
+            jsonl.write("\n")
+
+        if "parquet" in self.formats:
+            records.append(record)
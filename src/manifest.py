@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+
+from src.data_classes import PMMLCardExt
+from src.settings import get_logger, settings
+
+
+log = get_logger("manifest.log")
+
+# Change when generated code changes to regenerate all cards
+GENERATOR_VERSION = 2
+
+# Settings which change content of generated cards
+OUTPUT_SETTINGS = ("REPORT_FIELDS_TYPE", "REPORT_LINE_START")
+
+
+@dataclass
+class CardManifest:
+    """Stores fingerprints of inputs for every written card."""
+
+    filename: str
+    # Card info by score name: {'INC00_NAME': {'source': 'test.pmml', 'fingerprint': '...', 'output': 'cards/INC00_NAME.md'}}
+    cards: dict[str, dict] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.cards = self.load()
+
+    def load(self) -> dict[str, dict]:
+        try:
+            with open(self.filename, "r") as f:
+                manifest = json.load(f)
+
+        except FileNotFoundError:
+            return {}
+
+        except Exception as e:
+            log.warning(f"Manifest '{self.filename}' was not loaded, all cards will be written: {e}")
+            return {}
+
+        if manifest.get("version") != GENERATOR_VERSION:
+            return {}
+
+        return manifest.get("cards", {})
+
+    def save(self) -> None:
+        manifest = {"version": GENERATOR_VERSION, "cards": self.cards}
+
+        tmp_filename = f"{self.filename}.tmp"
+        with open(tmp_filename, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_filename, self.filename)
+
+    def get_fingerprint(self, card: PMMLCardExt) -> str:
+        """
+        Return hash of pmml file, OMDM and Excel info of all params and output settings.
+
+        Pmml file is fingerprinted by modification time and size, it is never read again after its header is parsed.
+        """
+
+        digest = hashlib.sha256()
+
+        try:
+            stat = os.stat(card.source)
+            digest.update(f"{card.source}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+        except OSError:
+            digest.update(card.source.encode())
+
+        for param in card.params:
+            digest.update(repr((param.name, param._type, param.pmml_name, param.method)).encode())
+
+        for setting in OUTPUT_SETTINGS:
+            digest.update(repr(getattr(settings, setting)).encode())
+
+        return digest.hexdigest()
+
+    def is_changed(self, card: PMMLCardExt, fingerprint: str, output: str) -> bool:
+        """Check if card has to be written again."""
+
+        entry = self.cards.get(card.score_name)
+
+        if entry is None or not os.path.exists(output):
+            return True
+
+        return entry["fingerprint"] != fingerprint
+
+    def update(self, card: PMMLCardExt, fingerprint: str, output: str, exported: bool = False) -> None:
+        """Record written card, exported - its code was also written to the export files."""
+
+        self.cards[card.score_name] = {
+            "source": card.source,
+            "fingerprint": fingerprint,
+            "output": output,
+            "exported": exported,
+        }
+
+    def is_exported(self, score_name: str) -> bool:
+        """Check if the export has code of card written with the current fingerprint."""
+
+        return self.cards.get(score_name, {}).get("exported", False)
+
+    def remove_missing(self, score_names: set[str]) -> list[str]:
+        """
+        Delete written cards which are not in score_names and whose pmml files are gone, return deleted files.
+
+        Cards of pmml files which still exist (e.g. were not parsed this time) are kept.
+        """
+
+        removed = []
+
+        for score_name, entry in list(self.cards.items()):
+            if score_name in score_names or os.path.exists(entry["source"]):
+                continue
+
+            output = self.cards.pop(score_name)["output"]
+
+            try:
+                os.remove(output)
+                removed.append(output)
+                log.info(f"Card '{output}' was removed, its pmml file is gone.")
+            except FileNotFoundError:
+                pass
+
+        return removed
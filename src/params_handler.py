@@ -1,26 +1,185 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 import xml.etree.ElementTree as ET
+import mmap
 import os
+import re
+import sys
+from typing import TYPE_CHECKING, Iterator
 
-import pandas
+# pandas is imported only on the excel path, it takes most of the startup time
+if TYPE_CHECKING:
+    import pandas
 
+from src.cache import ParseCache
 from src.data_classes import OMDMParam, FullParam, PMMLCard,ExcelParam, Files, PMMLCardExt
 from src.dir_handler import DirHandler
-from src.settings import get_logger
+from src.profiler import profiled, profiler
+from src.settings import get_logger, settings
+from src.templates import templates
+from src.validation import SKIPPED_KINDS, ValidationIssue, ValidationReport, check_param
 
 
 log = get_logger("params_handler.log")
 
 
+# Columns of the 'Data' sheet used for mapping
+NAME_COLUMN = "Var_Name"
+METHOD_COLUMN = "OMDM Data_Method"
+
+
+def normalize_name(name: str) -> str:
+    """Return param name in the form used for case-insensitive matching."""
+
+    return name.lower()
+
+
+# Attribute of schema in model.txt with name and type in any order:
+# <xs:attribute name="param_1" type="xs:decimal" use="optional"/> -> (b'param_1', b'xs:decimal', b'', b'')
+# <xs:attribute type="xs:decimal" name="param_1"/> -> (b'', b'', b'xs:decimal', b'param_1')
+# Attributes without name or type (references, nested types) do not match
+# Comments are matched as a whole with empty groups, so attributes commented out are skipped
+SCHEMA_ATTRIBUTE = re.compile(
+    rb"<!--.*?-->"
+    rb"|"
+    rb"<(?:[\w.-]+:)?attribute\b[^>]*?\s(?:"
+    rb"name\s*=\s*[\"']([^\"']*)[\"'][^>]*?\stype\s*=\s*[\"']([^\"']*)"
+    rb"|"
+    rb"type\s*=\s*[\"']([^\"']*)[\"'][^>]*?\sname\s*=\s*[\"']([^\"']*)"
+    rb")",
+    re.DOTALL,
+)
+
+
+def parse_schema_attributes(data) -> Iterator[tuple[str, str]]:
+    """
+    Scan schema text once and yield name and type without prefix of every attribute:
+    ('param_1', 'decimal')
+    """
+
+    for name, _type, other_type, other_name in SCHEMA_ATTRIBUTE.findall(data):
+        # Comment
+        if not (name or other_name):
+            continue
+
+        # From: xs:decimal
+        # To: decimal
+        yield (name or other_name).decode(), (_type or other_type).decode().rsplit(":", 1)[-1]
+
+
+# Top level PMML elements holding the model and its name
+PMML_MODEL_TAGS = (
+    "AnomalyDetectionModel",
+    "AssociationModel",
+    "BaselineModel",
+    "BayesianNetworkModel",
+    "ClusteringModel",
+    "GaussianProcessModel",
+    "GeneralRegressionModel",
+    "MiningModel",
+    "NaiveBayesModel",
+    "NearestNeighborModel",
+    "NeuralNetwork",
+    "RegressionModel",
+    "RuleSetModel",
+    "Scorecard",
+    "SequenceModel",
+    "SupportVectorMachineModel",
+    "TextModel",
+    "TimeSeriesModel",
+    "TreeModel",
+)
+
+
+def local_tag(tag: str) -> str:
+    """Return tag without namespace: '{http://www.dmg.org/PMML-4_4}DataField' -> 'DataField'."""
+
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_pmml_header(source) -> tuple[list[str], str]:
+    """
+    Read pmml incrementally until DataDictionary and model header are parsed.
+
+    Model body (segments, trees, coefficients) is never read.
+    Return tuple with DataField names and model name:
+    (['PARAM_1', 'PARAM_2'], 'INC00_NAME')
+    """
+
+    params = []
+    score_name = ""
+    dictionary_done = False
+
+    context = ET.iterparse(source, events=("start", "end"))
+    _, root = next(context)
+
+    for event, elem in context:
+        tag = local_tag(elem.tag)
+
+        if event == "start":
+            if tag in PMML_MODEL_TAGS:
+                score_name = elem.get("modelName", "")
+                break
+            continue
+
+        if tag == "DataField":
+            # Same names repeat in many cards, interned strings are stored once
+            params.append(sys.intern(elem.get("name")))
+
+        if tag == "DataDictionary":
+            dictionary_done = True
+
+        # Parsed elements are not needed anymore
+        elem.clear()
+
+        if dictionary_done:
+            root.clear()
+
+    return params, score_name
+
+
+def read_pmml_card(filename: str) -> PMMLCard:
+    """Parse ONE pmml card, errors are raised to the caller."""
+
+    with open(filename, "rb") as pmml:
+        params, score_name = parse_pmml_header(pmml)
+
+    return PMMLCard(score_name, params, filename)
+
+
+def read_pmml_card_safe(filename: str) -> tuple[PMMLCard, str]:
+    """
+    Parse ONE pmml card in a worker process.
+
+    Return tuple with PMMLCard instance and error message (empty if parsed):
+    (PMMLCard(score_name='', params=[]), "[Errno 2] No such file or directory: 'test.pmml'")
+    """
+
+    try:
+        return read_pmml_card(filename), ""
+    except Exception as e:
+        return PMMLCard("", source=filename), f"{type(e).__name__}: {e}"
+
+
 @dataclass
 class PMMLExtractor:
 
     pmml_files: list = field(default_factory=list)
     full_pmml_data: list[PMMLCard] = field(default_factory=list)
+    # Number of processes to parse files with, 1 - parse in current process
+    workers: int = 1
+    # Errors of parsing by file name
+    errors: dict[str, str] = field(default_factory=dict)
+    cache: ParseCache = None
+    # False - files are parsed one by one with iter_pmml_data
+    parse_on_init: bool = True
 
     def __post_init__(self) -> None:
         # Write data parsed from ALL .pmml files to class property on creation
-        self.full_pmml_data = self.parse_all_pmml()
+        if self.parse_on_init:
+            self.full_pmml_data = self.parse_all_pmml()
 
     def get_pmml_data(self, filename: str) -> PMMLCard:
         """
@@ -32,119 +191,250 @@ class PMMLExtractor:
             params: list ['PARAM_1', 'PARAM_2', 'PARAM_3', 'PARAM_4']
         """
 
-        params = []
-        score_name = ""
-        param_str = '<DataField dataType="'
-        score_str = '<RegressionModel functionName="'
+        result, error = read_pmml_card_safe(filename)
+        profiler.count_file(filename)
 
-        try:
-            with open(filename, "r") as pmml:
-                for line in pmml.readlines():
-                    if param_str in line:
-                        root = ET.fromstring(line)
-                        params.append(root.attrib["name"])
-                    if score_str in line:
-                        for _ in line.split(" "):
-                            if "modelName" in _:
-                                score_name = _.split('"')[1]
+        if error:
+            self.errors[filename] = error
 
-        except Exception as e:
-            log.error(e)
-        
-        result = PMMLCard(score_name, params)
         return result
 
+    def get_cached_card(self, filename: str) -> PMMLCard | None:
+        """Return card of file from cache or None, cached card may be parsed from a copy of file with another name."""
+
+        if self.cache is None:
+            return None
+
+        card = self.cache.get("pmml", filename)
+
+        if card is not None:
+            card.source = filename
+
+        return card
+
+    @profiled("PMMLExtractor")
     def parse_all_pmml(self) -> list[PMMLCard]:
         """
         Parse ALL pmml files!
 
-        Return list of PMMLCard classes
+        Return list of PMMLCard classes in the same order as pmml_files, files which were not parsed are in errors
         """
-        all_pmml_data = []
+        all_pmml_data = [self.get_cached_card(pmml_file) for pmml_file in self.pmml_files]
+
+        # Parse only files which are not in cache
+        missing_files = [pmml_file for pmml_file, card in zip(self.pmml_files, all_pmml_data) if card is None]
+        parsed_cards = iter(self.parse_pmml_files(missing_files))
+
+        for i, card in enumerate(all_pmml_data):
+            if card is not None:
+                continue
+
+            pmml_file = self.pmml_files[i]
+            all_pmml_data[i] = next(parsed_cards)
+
+            if self.cache is not None and pmml_file not in self.errors:
+                self.cache.put("pmml", pmml_file, all_pmml_data[i])
+
+        self.report_errors()
+
+        return [card for pmml_file, card in zip(self.pmml_files, all_pmml_data) if pmml_file not in self.errors]
+
+    def iter_pmml_data(self) -> Iterator[PMMLCard]:
+        """Parse pmml files one at a time, yield PMMLCard for every parsed file in order of pmml_files."""
 
         for pmml_file in self.pmml_files:
-            all_pmml_data.append(self.get_pmml_data(pmml_file))
+            with profiler.stage("PMMLExtractor"):
+                card = self.get_cached_card(pmml_file)
+
+                if card is None:
+                    card = self.get_pmml_data(pmml_file)
+
+                    # Files which were not parsed are only reported
+                    if pmml_file in self.errors:
+                        continue
+
+                    if self.cache is not None:
+                        self.cache.put("pmml", pmml_file, card)
+
+            yield card
+
+        self.report_errors()
+
+    def parse_pmml_files(self, pmml_files: list[str]) -> list[PMMLCard]:
+        """Parse pmml files one by one or in a pool of processes."""
+
+        if self.workers > 1 and len(pmml_files) > 1:
+            return self.parse_pmml_files_parallel(pmml_files)
+
+        return [self.get_pmml_data(pmml_file) for pmml_file in pmml_files]
+
+    def parse_pmml_files_parallel(self, pmml_files: list[str]) -> list[PMMLCard]:
+        """Parse pmml files in a pool of processes."""
+
+        all_pmml_data = []
+        chunksize = max(1, len(pmml_files) // (self.workers * 4))
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            results = executor.map(read_pmml_card_safe, pmml_files, chunksize=chunksize)
+
+            for pmml_file, (card, error) in zip(pmml_files, results):
+                profiler.count_file(pmml_file)
+
+                if error:
+                    self.errors[pmml_file] = error
+                all_pmml_data.append(card)
 
         return all_pmml_data
 
+    def report_errors(self) -> None:
+        """Log all files which were not parsed."""
+
+        if not self.errors:
+            return
+
+        log.error(f"{len(self.errors)} of {len(self.pmml_files)} pmml files were not parsed:")
+
+        for pmml_file, error in self.errors.items():
+            log.error(f"    '{pmml_file}' - {error}")
+
 @dataclass
 class OMDMExtractor:
 
     filename: str
     model_params: list[OMDMParam] = field(default_factory=list)
+    params_index: dict[str, OMDMParam] = field(default_factory=dict)
+    collisions: dict[str, list[OMDMParam]] = field(default_factory=dict)
+    cache: ParseCache = None
 
+    @profiled("OMDMExtractor")
     def __post_init__(self) -> None:
-        self.model_params = self.get_omdm_params()
+        self.model_params = self.cache.get("omdm", self.filename) if self.cache is not None else None
+
+        if self.model_params is None:
+            self.model_params = self.get_omdm_params()
+            profiler.count_file(self.filename)
+
+            if self.cache is not None and self.model_params:
+                self.cache.put("omdm", self.filename, self.model_params)
+
+        self.params_index, self.collisions = self.build_params_index()
 
     def get_omdm_params(self) -> list[OMDMParam]:
 
         """
-        Return list of list:
+        Return list of OMDM params of all attributes in model.txt:
         [
-            ['param_1', 'decimal'], 
-            ['Param_2', 'decimal'], 
-            ['PARAM_3', 'string'], 
-            ['ParAm_4', 'string']
+            OMDMParam('param_1', 'decimal'),
+            OMDMParam('Param_2', 'decimal'),
+            OMDMParam('PARAM_3', 'string'),
         ]
         """
 
         result = []
-        args = {}
-        params_list = []
 
         try:
-            # Open model.txt to get OMDM params
-            with open(self.filename, "r") as f:
-
-                for line in f.readlines():
-                    params = []
-
-                    # From: <xs:attribute name="param_1" type="xs:decimal" use="optional"/>
-                    # To: name="param_1", type="xs:decimal"
-                    for _ in line.split(" ")[1:3]:
-                        # From: name="param_1", type="xs:decimal"
-                        # To: param_1, xs:decimal
-                        params.append(_.split('"')[1])
-
-                    params_list.append(params)
-
-            for value in params_list:
-                # Name
-                args["name"] = value[0]
-
-                # From: xs:decimal
-                # To: decimal
-                args["_type"] = value[1].split(":")[1]
-                
-                result.append(OMDMParam(**args))
-                
+            # model.txt is scanned in place, it is never read into memory as lines
+            with open(self.filename, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return result
+
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    for name, _type in parse_schema_attributes(data):
+                        result.append(OMDMParam(sys.intern(name), sys.intern(_type)))
+
         except Exception as e:
             log.error(e)
 
         return result
 
-    def find_omdm_param(self, name: str) -> OMDMParam:
+    def build_params_index(self) -> tuple[dict[str, OMDMParam], dict[str, list[OMDMParam]]]:
+        """
+        Return index of OMDM params by normalized name and all ambiguous names:
+        (
+            {'param_1': OMDMParam('param_1', 'decimal'), ...},
+            {'param_2': [OMDMParam('Param_2', 'decimal'), OMDMParam('PARAM_2', 'decimal')]}
+        )
+        """
+
+        index = {}
+        collisions = {}
+
         for param in self.model_params:
-            if param.name.lower() == name.lower():
-                return param
+            key = normalize_name(param.name)
+
+            if key not in index:
+                index[key] = param
+                continue
+
+            if key not in collisions:
+                collisions[key] = [index[key]]
+            collisions[key].append(param)
+
+        for key, params in collisions.items():
+            names = ", ".join(f"'{param.name}'" for param in params)
+            log.error(f"Ambiguous OMDM params for '{key}': {names}.")
+
+        return index, collisions
+
+    def find_omdm_param(self, name: str) -> OMDMParam:
+        """Return OMDM param with the same name regardless of case."""
+
+        key = normalize_name(name)
+
+        if key in self.collisions:
+            # Exact match is the only way to choose between ambiguous params
+            for param in self.collisions[key]:
+                if param.name == name:
+                    return param
+
+            log.error("Param '%s' is ambiguous in '%s', using '%s'.", name, self.filename, self.params_index[key].name)
+
+        return self.params_index.get(key)
 
 
 @dataclass
 class XlsxExtractor:
 
     filename: str
-    sheet: pandas.DataFrame = pandas.DataFrame()
-
+    sheet: pandas.DataFrame = None
+    params_table: pandas.DataFrame = None
+    cache: ParseCache = None
+    # How to read excel file:
+    # "pandas" - pandas.read_excel with mapping columns only
+    # "openpyxl" - read-only workbook, rows are streamed
+    # "sidecar" - csv file with mapping columns next to excel file, exported on first use
+    reader: str = "pandas"
+
+    @profiled("XlsxExtractor")
     def __post_init__(self):
+        cached = self.cache.get("xlsx", self.filename, settings.SHEET_NAME) if self.cache is not None else None
+
+        if cached is not None:
+            self.sheet, self.params_table = cached
+            return
+
         self.sheet = self.parse_xlsx()
+        self.params_table = self.build_params_table()
+        profiler.count_file(self.filename)
+
+        # Only mapping columns are needed on the next run
+        if self.cache is not None and {NAME_COLUMN, METHOD_COLUMN}.issubset(self.sheet.columns):
+            self.cache.put("xlsx", self.filename, (self.sheet[[NAME_COLUMN, METHOD_COLUMN]], self.params_table), settings.SHEET_NAME)
 
     def parse_xlsx(self) -> pandas.DataFrame:
-        """Return a DataFrame object with excel sheet content."""
+        """Return a DataFrame object with mapping columns of excel sheet."""
+
+        import pandas
 
         xlsx_sheet = pandas.DataFrame()
 
         try:
-            xlsx_sheet = pandas.read_excel(self.filename, sheet_name='Data')
+            if self.reader == "openpyxl":
+                xlsx_sheet = self.read_xlsx_streaming()
+            elif self.reader == "sidecar":
+                xlsx_sheet = self.read_xlsx_sidecar()
+            else:
+                xlsx_sheet = pandas.read_excel(self.filename, sheet_name=settings.SHEET_NAME, usecols=[NAME_COLUMN, METHOD_COLUMN])
             log.debug(f"OK - File '{self.filename}' was parsed into dataframe.")
 
         except Exception as e:
@@ -152,60 +442,131 @@ class XlsxExtractor:
 
         return xlsx_sheet
 
-    def find_param_in_xlsx(self, param: str) -> pandas.DataFrame:
-        """Return a DataFrame object with all occurances of inputed param."""
+    def read_xlsx_streaming(self) -> pandas.DataFrame:
+        """Read only mapping columns row by row from read-only workbook."""
+
+        import openpyxl
+        import pandas
 
-        # All cases of param (PARAM, param, Param)
-        param_query = [param.upper(), param.lower(), param]
+        workbook = openpyxl.load_workbook(self.filename, read_only=True, data_only=True)
 
         try:
-            result = self.sheet.loc[self.sheet['Var_Name'].isin(param_query)]
-            
-        except Exception as e:
-            log.error(e)
+            rows = workbook[settings.SHEET_NAME].iter_rows(values_only=True)
+            header = list(next(rows, ()))
 
-        return result
+            name_index = header.index(NAME_COLUMN)
+            method_index = header.index(METHOD_COLUMN)
+            names = []
+            methods = []
 
-    def get_param_info(self, param_name: str) -> ExcelParam:
-        """Return ExcelParam instance with name and method from all occurances in excel."""
+            for row in rows:
+                names.append(row[name_index] if name_index < len(row) else None)
+                methods.append(row[method_index] if method_index < len(row) else None)
 
-        param_info = {}
+        finally:
+            workbook.close()
 
-        try:
-            excel_info = self.find_param_in_xlsx(param_name).to_dict()
+        return pandas.DataFrame({NAME_COLUMN: names, METHOD_COLUMN: methods}, dtype=object)
 
-        except Exception as e:
-            log.error(e)
+    def get_sidecar_filename(self) -> str:
+        """Return name of csv file with mapping columns: 'test.xlsx' -> 'test.Data.csv'."""
+
+        return f"{os.path.splitext(self.filename)[0]}.{settings.SHEET_NAME}.csv"
+
+    def read_xlsx_sidecar(self) -> pandas.DataFrame:
+        """Read mapping columns from csv sidecar, export it from excel if it is missing or outdated."""
+
+        import pandas
+
+        sidecar = self.get_sidecar_filename()
 
-        # Get all param info from find_param response
-        var_name = list(excel_info["Var_Name"].values())
-        var_methods = list(excel_info["OMDM Data_Method"].values())
+        if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(self.filename):
+            return pandas.read_csv(sidecar, usecols=[NAME_COLUMN, METHOD_COLUMN], dtype=str)
 
-        # Check if "Var_Name" is empty
-        if not var_name:
-            log.error(f"Parameter {param_name} was not found.")
+        xlsx_sheet = self.read_xlsx_streaming()
+        xlsx_sheet.to_csv(sidecar, index=False)
+        log.info(f"Mapping columns of '{self.filename}' were exported to '{sidecar}'.")
 
-        # Delete duplicates from name and method and pack into dict
-        if var_name:
+        return xlsx_sheet
+
+    def build_params_table(self) -> pandas.DataFrame:
+        """
+        Return a DataFrame indexed by normalized param name with first name and all unique methods:
+
+                     name     method
+            norm_name
+            param_1  PARAM_1  ['dmi_App_Get_PARAM_1']
+            param_2  Param_2  ['dmi_App_Get_PARAM_2', 'dmi_App_Get_PARAM_2_NEW']
+        """
+
+        import pandas
 
-            # Delete duplicates of param name and get it as str
-            param_name = list(dict.fromkeys(var_name))[0]
+        columns = [NAME_COLUMN, METHOD_COLUMN]
 
-            # Delete duplicates of param method 
-            param_method = list(dict.fromkeys(var_methods))
+        if not set(columns).issubset(self.sheet.columns):
+            log.error(f"File '{self.filename}' has no columns {columns}.")
+            return pandas.DataFrame(columns=["name", "method"], index=pandas.Index([], name="norm_name"))
 
-            # Check if there is more than one method for param
-            if len(param_method) > 1:
-                log.error(f"For '{param_name}' exists more than one method!")
+        table = self.sheet[columns].dropna(subset=[NAME_COLUMN])
+        table = table.assign(norm_name=table[NAME_COLUMN].astype(str).str.lower())
 
-            # Get param method as string
-            if len(param_method) == 1:
-                param_method = param_method[0]
+        # Same method listed several times for one param is not a conflict
+        table = table.drop_duplicates(subset=["norm_name", METHOD_COLUMN])
 
-            param_info["name"] = param_name
-            param_info["method"] = param_method
+        grouped = table.drop_duplicates(subset=["norm_name"]).set_index("norm_name")
+        grouped = grouped[[NAME_COLUMN, METHOD_COLUMN]].rename(columns={NAME_COLUMN: "name", METHOD_COLUMN: "method"})
 
-        return ExcelParam(**param_info)
+        # Only params with several methods need grouping, others get a list with one method
+        conflicts = table[table.duplicated(subset=["norm_name"], keep=False)]
+        conflict_methods = conflicts.groupby("norm_name", sort=False)[METHOD_COLUMN].agg(list).to_dict()
+
+        grouped["method"] = [
+            conflict_methods.get(norm_name, [method])
+            for norm_name, method in zip(grouped.index, grouped["method"])
+        ]
+
+        return grouped
+
+    def get_all_params_info(self, param_names: list[str]) -> dict[str, ExcelParam]:
+        """
+        Resolve unique param names in one merge.
+        Names are matched regardless of case: 'Param_27' finds 'PARAM_27' and 'param_27' in xlsx.
+
+        Return dict with ExcelParam instance for every unique param name:
+        {
+            'PARAM_1': ExcelParam(name='PARAM_1', method='dmi_App_Get_PARAM_1'),
+            'PARAM_5': ExcelParam(name=[], method=[]),
+        }
+        """
+
+        import pandas
+
+        query = pandas.DataFrame({"pmml_name": param_names}, dtype=object)
+        query["norm_name"] = query["pmml_name"].str.lower()
+
+        merged = query.merge(self.params_table, how="left", left_on="norm_name", right_index=True)
+
+        missing = merged["name"].isna()
+        conflicts = merged["method"].map(lambda methods: isinstance(methods, list) and len(methods) > 1)
+
+        for param_name in merged.loc[missing, "pmml_name"]:
+            log.error("Parameter %s was not found.", param_name)
+
+        for param_name in merged.loc[conflicts, "name"]:
+            log.error("For '%s' exists more than one method!", param_name)
+
+        result = {}
+
+        for pmml_name, name, methods, is_missing in zip(merged["pmml_name"], merged["name"], merged["method"], missing):
+            if is_missing:
+                result[pmml_name] = ExcelParam()
+                continue
+
+            # Get param method as string, keep list to show the conflict
+            method = methods[0] if len(methods) == 1 else methods
+            result[pmml_name] = ExcelParam(name=name, method=method)
+
+        return result
 
 
 @dataclass
@@ -214,47 +575,161 @@ class ParamsCombiner:
     excel_data: XlsxExtractor = None
     omdm_data: OMDMExtractor = None
     pmml_data: PMMLExtractor = None
+    cache: ParseCache = None
+    # True - pmml files are parsed lazily by iter_cards
+    stream: bool = False
+    # Directory with input files, working directory if empty
+    path: str = ""
+    # Params resolved once by pmml name and shared by all cards, None for params which can not be generated
+    resolved_params: dict[str, FullParam | None] = field(default_factory=dict)
+    # Problems of resolved params by pmml name
+    issues: dict[str, list[ValidationIssue]] = field(default_factory=dict)
 
     def __post_init__(self) -> None:
         self.extract_data_from_files()
 
     def extract_data_from_files(self) -> None:
-        # Get path of script
-        path = os.path.abspath(os.getcwd())
+        # Directory is not scanned when all extractors are shared
+        if None not in (self.pmml_data, self.omdm_data, self.excel_data):
+            return
+
+        # Get path of project, working directory by default
+        path = os.path.abspath(self.path or os.getcwd())
         
         # Get list of files in path
-        files = DirHandler(path)
+        files = DirHandler(path, recursive=settings.RECURSIVE_SEARCH)
 
-        # Create extractor class for evety file type
-        self.pmml_data = PMMLExtractor(files.pmml_files)
-        self.omdm_data = OMDMExtractor(files.model_file[0])
-        self.excel_data = XlsxExtractor(files.xlsx_file[0])
+        # Create extractor class for evety file type, shared extractors are reused
+        if self.pmml_data is None:
+            self.pmml_data = PMMLExtractor(
+                files.pmml_files,
+                workers=settings.PMML_WORKERS,
+                cache=self.cache,
+                parse_on_init=not self.stream,
+            )
+
+        if self.omdm_data is None:
+            self.omdm_data = OMDMExtractor(self.get_single_file(files.model_file, "model"), cache=self.cache)
+
+        if self.excel_data is None:
+            self.excel_data = XlsxExtractor(self.get_single_file(files.xlsx_file, "xlsx"), cache=self.cache, reader=settings.XLSX_READER)
+
+    def get_single_file(self, filenames: list[str], kind: str) -> str:
+        """Return the first file of kind, there should be exactly one."""
+
+        if not filenames:
+            log.fatal(f"No {kind} file was found in '{self.path or os.getcwd()}'!")
+            raise SystemExit
+
+        if len(filenames) > 1:
+            log.warning(f"Found {len(filenames)} {kind} files, '{filenames[0]}' is used.")
+
+        return filenames[0]
+
+    def resolve_params(self, cards: list[PMMLCard]) -> None:
+        """Resolve every param of cards which was not resolved before, each unique name only once."""
 
-    def prepare_score_card(self, card: PMMLCard) -> list[FullParam]:
         args = {}
-        result = []
 
-        for param_name in card.params:
+        param_names = list(dict.fromkeys(
+            param for card in cards for param in card.params if param not in self.resolved_params
+        ))
+
+        if not param_names:
+            return
+
+        excel_params = self.excel_data.get_all_params_info(param_names)
+
+        # Templates are checked once for every type
+        missing_targets = {}
+
+        for param_name in param_names:
             omdm_info = self.omdm_data.find_omdm_param(param_name)
-            excel_info = self.excel_data.get_param_info(param_name)
+            excel_info = excel_params[param_name]
+
+            if omdm_info is not None and omdm_info._type not in missing_targets:
+                missing_targets[omdm_info._type] = (
+                    templates.get_missing_targets(omdm_info._type),
+                    templates.get_missing_targets(omdm_info._type, sections=True),
+                )
+
+            core_targets, section_targets = missing_targets.get(omdm_info._type, ([], [])) if omdm_info is not None else ([], [])
+
+            issues = check_param(
+                param_name,
+                omdm_info,
+                excel_info,
+                self.omdm_data.collisions.get(normalize_name(param_name), []),
+                core_targets,
+                section_targets,
+            )
+
+            if issues:
+                self.issues[param_name] = issues
+
+            if any(issue.kind in SKIPPED_KINDS for issue in issues):
+                log.error(f"Param '{param_name}' is skipped: {', '.join(issue.kind for issue in issues)}.")
+                self.resolved_params[param_name] = None
+                continue
 
             args["name"] = omdm_info.name
             args["_type"] = omdm_info._type
             args["pmml_name"] = param_name
             args["method"] = excel_info.method
-        
-            result.append(FullParam(**args))
-        
+
+            self.resolved_params[param_name] = FullParam(**args)
+
+        profiler.count("params_resolved", len(param_names))
+
+    def prepare_score_card(self, card: PMMLCard) -> list[FullParam]:
+        """Return params of card, FullParam objects are shared with other cards."""
+
+        self.resolve_params([card])
+
+        result = [param for param_name in card.params if (param := self.resolved_params[param_name]) is not None]
+
+        profiler.count("card_params", len(result))
+
         return result
 
+    @profiled("ParamsCombiner")
     def prepare_all_cards(self) -> list[PMMLCardExt]:
         args = {}
         result = []
 
+        # Union of params of all cards is resolved at once
+        self.resolve_params(self.pmml_data.full_pmml_data)
+
         for card in self.pmml_data.full_pmml_data:
             args["score_name"] = card.score_name
             args["params"] = self.prepare_score_card(card)
+            args["source"] = card.source
 
             result.append(PMMLCardExt(**args))
         
         return result
+
+    def validate(self) -> ValidationReport:
+        """
+        Resolve params of all cards and return all problems at once, nothing is generated or written.
+
+        In streaming mode pmml files are read one more time, only names of params are kept.
+        """
+
+        if self.stream:
+            cards = [PMMLCard(card.score_name, card.params) for card in self.pmml_data.iter_pmml_data()]
+        else:
+            cards = self.pmml_data.full_pmml_data
+
+        with profiler.stage("validation"):
+            self.resolve_params(cards)
+            return ValidationReport.from_issues(cards, self.issues)
+
+    def iter_cards(self) -> Iterator[PMMLCardExt]:
+        """Parse and resolve cards one at a time, memory does not grow with number of cards."""
+
+        for card in self.pmml_data.iter_pmml_data():
+            with profiler.stage("ParamsCombiner"):
+                card_ext = PMMLCardExt(card.score_name, self.prepare_score_card(card), card.source)
+
+            yield card_ext
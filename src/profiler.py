@@ -0,0 +1,169 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Callable
+
+from src.settings import get_logger
+
+
+log = get_logger("profiler.log")
+
+
+@dataclass
+class StageStats:
+    # Time spent in one stage of pipeline
+    calls: int = 0
+    wall: float = 0.0
+    # CPU time of the thread which ran the stage, work of worker processes is not included
+    cpu: float = 0.0
+
+
+@dataclass
+class Profiler:
+    """Collects time of pipeline stages and counters of processed data."""
+
+    enabled: bool = False
+    stages: dict[str, StageStats] = field(default_factory=dict)
+    counters: dict[str, int] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Measure wall and CPU time of code block, nothing is measured when disabled."""
+
+        if not self.enabled:
+            yield
+            return
+
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+
+            with self.lock:
+                stats = self.stages.setdefault(name, StageStats())
+                stats.calls += 1
+                stats.wall += wall
+                stats.cpu += cpu
+
+    def count(self, name: str, value: int = 1) -> None:
+        if not self.enabled:
+            return
+
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def count_file(self, filename: str) -> None:
+        """Count parsed input file and its size."""
+
+        if not self.enabled:
+            return
+
+        try:
+            size = os.path.getsize(filename)
+        except OSError:
+            size = 0
+
+        self.count("files_read")
+        self.count("bytes_read", size)
+
+    def reset(self) -> None:
+        self.stages.clear()
+        self.counters.clear()
+
+    def get_summary(self) -> dict:
+        return {
+            "stages": {name: asdict(stats) for name, stats in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+    def format_summary(self) -> str:
+        """Return summary as text table."""
+
+        lines = [f"{'stage':<40} {'calls':>7} {'wall, s':>10} {'cpu, s':>10}"]
+
+        for name, stats in self.stages.items():
+            lines.append(f"{name:<40} {stats.calls:>7} {stats.wall:>10.3f} {stats.cpu:>10.3f}")
+
+        lines.append("")
+        lines.append(f"{'counter':<40} {'value':>7}")
+
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<40} {value:>7}")
+
+        return "\n".join(lines)
+
+    def dump_json(self, filename: str) -> None:
+        with open(filename, "w") as f:
+            json.dump(self.get_summary(), f, indent=2)
+
+
+profiler = Profiler()
+
+
+def profiled(name: str) -> Callable:
+    """Decorator which measures every call of function as stage of profiler."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+
+            with profiler.stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def run_with_hook(func: Callable, hook: str = "", output: str = "profile"):
+    """
+    Run func under external profiler and save its report.
+
+    hook:
+    "cprofile" - cProfile, stats are saved to '<output>.prof', top functions are printed
+    "pyinstrument" - pyinstrument (optional dependency), report is saved to '<output>.html'
+    """
+
+    if hook == "cprofile":
+        import cProfile
+        import pstats
+
+        cprofiler = cProfile.Profile()
+
+        try:
+            return cprofiler.runcall(func)
+        finally:
+            cprofiler.dump_stats(f"{output}.prof")
+            pstats.Stats(cprofiler).sort_stats("cumulative").print_stats(20)
+
+    if hook == "pyinstrument":
+        try:
+            from pyinstrument import Profiler as InstrumentProfiler
+        except ImportError:
+            log.error("pyinstrument is not installed, pipeline is run without it.")
+            return func()
+
+        instrument_profiler = InstrumentProfiler()
+        instrument_profiler.start()
+
+        try:
+            return func()
+        finally:
+            instrument_profiler.stop()
+
+            with open(f"{output}.html", "w") as f:
+                f.write(instrument_profiler.output_html())
+            print(instrument_profiler.output_text())
+
+    return func()
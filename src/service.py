@@ -0,0 +1,291 @@
+import asyncio
+import io
+import json
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+from src.batch import init_shared_data, shared_data
+from src.code_generators import CodeCombiner
+from src.data_classes import PMMLCard, PMMLCardExt
+from src.params_handler import OMDMExtractor, ParamsCombiner, PMMLExtractor, XlsxExtractor, parse_pmml_header
+from src.settings import get_logger, get_settings_snapshot, settings
+from src.validation import ValidationReport
+
+
+log = get_logger("service.log")
+
+HTTP_STATUSES = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+# Number of last requests used for percentiles of request time
+METRICS_WINDOW = 1000
+
+
+def init_service_data(omdm_data: OMDMExtractor, excel_data: XlsxExtractor, settings_values: dict = None) -> None:
+    """Store extractors loaded once and combiner resolving params of all requests."""
+
+    init_shared_data(omdm_data, excel_data, settings_values)
+
+    shared_data["params_combiner"] = ParamsCombiner(
+        excel_data=excel_data,
+        omdm_data=omdm_data,
+        pmml_data=PMMLExtractor(parse_on_init=False),
+        resolved_params=shared_data["resolved_params"],
+        issues=shared_data["issues"],
+    )
+
+
+def read_card_payload(payload: dict) -> PMMLCard:
+    """
+    Return card from one item of request:
+    {"pmml": "<PMML ...>"} - pmml file content
+    {"score_name": "INC00_NAME", "params": ["PARAM_1"]} - already parsed card
+    """
+
+    if "pmml" in payload:
+        params, score_name = parse_pmml_header(io.BytesIO(payload["pmml"].encode()))
+        return PMMLCard(payload.get("score_name") or score_name, params, payload.get("source", ""))
+
+    if "score_name" in payload and isinstance(payload.get("params"), list):
+        return PMMLCard(payload["score_name"], [str(param) for param in payload["params"]], payload.get("source", ""))
+
+    raise ValueError("card should have 'pmml' or 'score_name' and 'params'")
+
+
+def generate_cards(payloads: list[dict]) -> list[dict]:
+    """Generate code of all cards of one request, problems of one card do not fail others."""
+
+    params_combiner = shared_data["params_combiner"]
+    code_combiner = CodeCombiner()
+    result = []
+
+    for payload in payloads:
+        try:
+            card = read_card_payload(payload)
+            card_ext = PMMLCardExt(card.score_name, params_combiner.prepare_score_card(card), card.source)
+            code = code_combiner.get_code_for_card(card_ext)
+            report = ValidationReport.from_issues([card], params_combiner.issues)
+
+            result.append({
+                "score_name": card.score_name,
+                "code": {system: generated.code for system, generated in code.items()},
+                "issues": [asdict(issue) for issue in report.issues],
+            })
+
+        except Exception as e:
+            result.append({"error": f"{type(e).__name__}: {e}"})
+
+    return result
+
+
+@dataclass
+class ServiceMetrics:
+    """Counters and time of served requests."""
+
+    requests: int = 0
+    failed: int = 0
+    in_flight: int = 0
+    cards: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    recent: deque = field(default_factory=lambda: deque(maxlen=METRICS_WINDOW))
+
+    def add(self, seconds: float, cards: int, failed: bool) -> None:
+        self.requests += 1
+        self.failed += failed
+        self.cards += cards
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.recent.append(seconds)
+
+    def get_percentile(self, percent: float) -> float:
+        if not self.recent:
+            return 0.0
+
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+    def get_summary(self) -> dict:
+        return {
+            "requests": self.requests,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "cards": self.cards,
+            "avg_seconds": round(self.seconds / self.requests, 6) if self.requests else 0.0,
+            "p50_seconds": round(self.get_percentile(50), 6),
+            "p95_seconds": round(self.get_percentile(95), 6),
+            "max_seconds": round(self.max_seconds, 6),
+        }
+
+
+@dataclass
+class GenerationService:
+    """
+    Serves generation requests with extractors loaded once, at most 'concurrency' requests are generated at the same time.
+
+    POST /generate  {"cards": [{"pmml": "<PMML ...>"}, {"score_name": "INC00_NAME", "params": ["PARAM_1"]}]}
+    GET  /metrics   counters and time of requests
+    GET  /health
+    """
+
+    omdm_data: OMDMExtractor
+    excel_data: XlsxExtractor
+    concurrency: int = settings.SERVICE_CONCURRENCY
+    # Number of processes for generation, 1 - threads of this process
+    workers: int = 1
+    timeout: float = settings.SERVICE_TIMEOUT
+    metrics: ServiceMetrics = field(default_factory=ServiceMetrics)
+
+    def __post_init__(self) -> None:
+        self.executor = self.get_executor()
+        self.semaphore = None
+
+    def get_executor(self) -> Executor:
+        if self.workers > 1:
+            # Extractors are sent to every worker once, not with every request
+            return ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=init_service_data,
+                initargs=(self.omdm_data, self.excel_data, get_settings_snapshot()),
+            )
+
+        init_service_data(self.omdm_data, self.excel_data)
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="generation")
+
+    async def generate(self, body: bytes) -> tuple[int, dict]:
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError as e:
+            return 400, {"error": f"Request is not JSON: {e}"}
+
+        payloads = request.get("cards", [request]) if isinstance(request, dict) else request
+
+        if not isinstance(payloads, list) or not all(isinstance(payload, dict) for payload in payloads):
+            return 400, {"error": "Request should be a card object, a list of cards or {'cards': [...]}."}
+
+        # Waiting requests do not take workers, they wait for a free slot here
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            cards = await asyncio.wait_for(loop.run_in_executor(self.executor, generate_cards, payloads), self.timeout)
+
+        return 200, {"cards": cards}
+
+    async def handle_request(self, method: str, path: str, body: bytes = b"") -> tuple[int, dict]:
+        """Return status and JSON response for request, can be called without a server."""
+
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+
+        if path == "/health":
+            return 200, {"status": "ok"}
+
+        if path == "/metrics":
+            return 200, self.metrics.get_summary()
+
+        if path != "/generate":
+            return 404, {"error": f"Unknown path '{path}'."}
+
+        if method != "POST":
+            return 405, {"error": "Use POST for /generate."}
+
+        start = time.perf_counter()
+        self.metrics.in_flight += 1
+        status, response = 500, {}
+
+        try:
+            status, response = await self.generate(body)
+
+        except asyncio.TimeoutError:
+            status, response = 503, {"error": f"Generation took more than {self.timeout} s."}
+
+        except Exception as e:
+            log.error(f"Request failed - {type(e).__name__}: {e}")
+            status, response = 500, {"error": f"{type(e).__name__}: {e}"}
+
+        finally:
+            seconds = time.perf_counter() - start
+            self.metrics.in_flight -= 1
+            self.metrics.add(seconds, len(response.get("cards", [])), status != 200)
+            response["seconds"] = round(seconds, 6)
+
+        return status, response
+
+    async def read_request(self, reader: asyncio.StreamReader) -> tuple[str, str, bytes]:
+        """Read HTTP/1.1 request: method, path without query and body."""
+
+        request_line = (await reader.readline()).decode("latin-1").split()
+
+        if len(request_line) != 3:
+            raise ValueError("Bad request line")
+
+        method, target, _ = request_line
+        content_length = 0
+
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+
+            if not line:
+                break
+
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                content_length = int(value.strip())
+
+        if content_length > settings.SERVICE_MAX_BODY:
+            raise OverflowError(f"Request body is larger than {settings.SERVICE_MAX_BODY} bytes")
+
+        body = await reader.readexactly(content_length) if content_length else b""
+
+        return method.upper(), target.split("?", 1)[0], body
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one request per connection."""
+
+        try:
+            method, path, body = await self.read_request(reader)
+            status, response = await self.handle_request(method, path, body)
+
+        except OverflowError as e:
+            status, response = 413, {"error": str(e)}
+
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            status, response = 400, {"error": f"Bad request: {e}"}
+
+        data = json.dumps(response).encode()
+
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_STATUSES.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode("latin-1") + data
+        )
+
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "", port: int = 0, socket_path: str = "") -> None:
+        """Serve on TCP host and port or on Unix socket until cancelled."""
+
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+            log.info(f"Serving on unix socket '{socket_path}'.")
+        else:
+            server = await asyncio.start_server(self.handle_connection, host or settings.SERVICE_HOST, port or settings.SERVICE_PORT)
+            log.info(f"Serving on http://{host or settings.SERVICE_HOST}:{port or settings.SERVICE_PORT}.")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(cancel_futures=True)
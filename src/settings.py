@@ -1,5 +1,10 @@
+import atexit
+import json
 import logging
-from dataclasses import dataclass
+import logging.handlers
+import os
+import queue
+from dataclasses import asdict, dataclass
 
 
 @dataclass
@@ -10,41 +15,214 @@ class Settings:
     # "standard" - for using in NSTM by hand (/Application/CDA[@CDAISACTIVE='Active']/CDAScore/CDAScoreParam[@CDASPNAME='{param}']/@CDASPVALUE)
     # "advanced" - for using in NSTM config file (\#Limit_min=/Application/CDA[@CDAISACTIVE='Active']/CDAScore/CDAScoreParam[@CDASPNAME='#Limit_min']/@CDASPVALUE;1;1;1;101)
     REPORT_FIELDS_TYPE: str = "standard"
-    REPORT_LINE_START: str = 0
+    # First number of advanced report lines
+    REPORT_LINE_START: int = 0
     SHEET_NAME: str = "Data"
+    # Look for input files in subdirectories of working directory too
+    RECURSIVE_SEARCH: bool = False
+    # How to read excel file: "pandas", "openpyxl" (streaming) or "sidecar" (csv exported once)
+    XLSX_READER: str = "pandas"
+    # Number of processes for parsing .pmml files, 1 - parse one by one
+    PMML_WORKERS: int = 1
+    # Number of processes for generating code, 1 - generate one by one
+    CODE_WORKERS: int = 1
+    # Number of generated cards waiting to be written
+    WRITE_QUEUE_SIZE: int = 32
+    # Parse cache of input files
+    CACHE_DIR: str = ".cache"
+    CACHE_MAX_SIZE: int = 256 * 1024 * 1024
+    # "content" - files are compared by content hash, "stat" - by modification time and size
+    CACHE_KEY: str = "content"
+    # Check params of all cards before generation and stop if any of them has problems
+    FAIL_FAST: bool = False
+    # Watch mode: seconds between checks of input files and seconds they should stay unchanged before regeneration
+    WATCH_INTERVAL: float = 0.2
+    WATCH_DEBOUNCE: float = 0.3
+    # Generation service: address, number of requests generated at the same time,
+    # seconds to wait for generation and max size of request body in bytes
+    SERVICE_HOST: str = "127.0.0.1"
+    SERVICE_PORT: int = 8765
+    SERVICE_CONCURRENCY: int = 4
+    SERVICE_TIMEOUT: float = 30.0
+    SERVICE_MAX_BODY: int = 64 * 1024 * 1024
 
 
 settings = Settings()
 
+
+def get_settings_snapshot() -> dict:
+    """Return current settings, including ones changed from command line, to send them to worker processes."""
+
+    return asdict(settings)
+
+
+def apply_settings(values: dict) -> None:
+    """
+    Set settings of worker process from snapshot of the main process.
+
+    Workers started with 'spawn' or 'forkserver' import default settings only.
+    """
+
+    for name, value in values.items():
+        setattr(settings, name, value)
+
 # Logger settings
-LOG_LEVEL = logging.DEBUG
+LOG_DIR = "log"
+LOG_LEVEL = logging.INFO
 FORMAT = "%(asctime)s - [%(levelname)s] - (%(filename)s).%(funcName)s(%(lineno)d) - %(message)s"
+# "text" - FORMAT above, "json" - one JSON object per line
+LOG_FORMAT = "text"
+# Parent of all loggers returned by get_logger
+LOGGER_NAME = "score_card"
+
+# Handler for every destination: "console" and log file names
+log_handlers: dict[str, logging.Handler] = {}
+log_queue = queue.SimpleQueue()
+log_listener: logging.handlers.QueueListener = None
+# Process which owns the listener thread, forked workers write records directly
+log_listener_pid = 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats record as one JSON line for log processing tools."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        result = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "function": record.funcName,
+            "line": record.lineno,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+
+        if record.exc_info:
+            result["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(result)
+
+
+class LogFileHandler(logging.FileHandler):
+    """File handler which creates log directory when the first record is written."""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class LoggerFilter(logging.Filter):
+    """Passes only records of one logger, so each module writes to its own file."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__()
+        self.logger_name = name
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.name == self.logger_name
+
+
+class NonBlockingHandler(logging.handlers.QueueHandler):
+    """Puts records to queue, the listener thread writes them to console and files."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Listener thread is not copied to forked worker process
+        if os.getpid() != log_listener_pid:
+            write_record(record)
+            return
+
+        super().emit(record)
 
-def get_logger(log_file_name: str) -> object:
 
-    with open("log/other.log", "a"):
-        pass
+class QueueListener(logging.handlers.QueueListener):
+    """Queue listener which writes every record to all current handlers."""
 
-    filename = f"log/{log_file_name}"
+    def handle(self, record: logging.LogRecord) -> None:
+        write_record(record)
 
-    # Create a custom logger
-    logger = logging.getLogger(__name__)
 
-    # Create a custom format
-    formatter = logging.Formatter(FORMAT)
+def get_formatter() -> logging.Formatter:
+    if LOG_FORMAT == "json":
+        return JsonFormatter()
+
+    return logging.Formatter(FORMAT)
+
+
+def write_record(record: logging.LogRecord) -> None:
+    for handler in tuple(log_handlers.values()):
+        if record.levelno >= handler.level:
+            handler.handle(record)
+
+
+def start_log_listener() -> None:
+    """Create console handler and start the only listener thread, once per process."""
+
+    global log_listener, log_listener_pid
+
+    if log_listener is not None:
+        return
 
-    # Create handlers
     c_handler = logging.StreamHandler()
-    f_handler = logging.FileHandler(filename)
-    c_handler.setLevel(LOG_LEVEL)
-    f_handler.setLevel(LOG_LEVEL)
+    c_handler.setFormatter(get_formatter())
+    log_handlers["console"] = c_handler
+
+    parent = logging.getLogger(LOGGER_NAME)
+    parent.setLevel(LOG_LEVEL)
+    parent.addHandler(NonBlockingHandler(log_queue))
+    # Records are not passed to handlers of root logger
+    parent.propagate = False
+
+    log_listener = QueueListener(log_queue)
+    log_listener_pid = os.getpid()
+    log_listener.start()
+
+    atexit.register(stop_log_listener)
+
+
+def stop_log_listener() -> None:
+    """Write all queued records and stop the listener thread."""
+
+    if log_listener is not None and log_listener._thread is not None:
+        log_listener.stop()
+
+
+def configure_logging(level: int = None, log_format: str = None) -> None:
+    """Change level or format of all loggers and handlers, e.g. from command line options."""
+
+    global LOG_LEVEL, LOG_FORMAT
+
+    if level is not None:
+        LOG_LEVEL = level
+        logging.getLogger(LOGGER_NAME).setLevel(level)
+
+    if log_format is not None:
+        LOG_FORMAT = log_format
+        for handler in log_handlers.values():
+            handler.setFormatter(get_formatter())
+
+
+def get_logger(log_file_name: str) -> logging.Logger:
+    """
+    Return logger of module which writes to console and to 'log/<log_file_name>'.
+
+    Calling it several times does not add handlers, every destination has one handler.
+    Records are written by a separate thread, so logging does not block processing.
+    Use lazy arguments in hot loops: log.debug("Param %s", name) is not formatted below LOG_LEVEL.
+    """
+
+    start_log_listener()
+
+    name = f"{LOGGER_NAME}.{os.path.splitext(log_file_name)[0]}"
+    logger = logging.getLogger(name)
 
-    # Create formatters and add it to handlers
-    c_handler.setFormatter(formatter)
-    f_handler.setFormatter(formatter)
+    filename = os.path.join(LOG_DIR, log_file_name)
 
-    # Add handlers to the logger
-    logger.addHandler(c_handler)
-    logger.addHandler(f_handler)
+    if filename not in log_handlers:
+        # File is created only when the first record is written
+        f_handler = LogFileHandler(filename, delay=True)
+        f_handler.setFormatter(get_formatter())
+        f_handler.addFilter(LoggerFilter(name))
+        log_handlers[filename] = f_handler
 
-    return logger
\ No newline at end of file
+    return logger
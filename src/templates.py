@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field
+from string import Formatter
+from typing import Callable, Iterable
+
+from src.data_classes import FullParam
+from src.settings import get_logger
+
+
+log = get_logger("templates.log")
+
+# Type of template used for params of any type without own template
+ANY_TYPE = "*"
+
+# Fields available in param templates
+TEMPLATE_FIELDS = ("name", "_type", "pmml_name", "method", "score_name")
+
+
+def compile_template(template: str) -> Callable[..., str]:
+    """
+    Check fields of template once and return its renderer:
+    'xScoreInput.{name};' -> 'xScoreInput.{name};'.format
+    """
+
+    for _, field_name, _, _ in Formatter().parse(template):
+        if field_name is not None and field_name not in TEMPLATE_FIELDS:
+            raise ValueError(f"Unknown field '{{{field_name}}}' in template, available fields: {', '.join(TEMPLATE_FIELDS)}.")
+
+    return template.format
+
+
+@dataclass
+class TemplateRegistry:
+    """Code templates of one param by target and param type, templates are compiled on registration."""
+
+    renderers: dict[tuple[str, str], Callable[..., str]] = field(default_factory=dict)
+    # Extra card sections: title by target, code of every param is rendered from templates
+    sections: dict[str, str] = field(default_factory=dict)
+
+    def register(self, target: str, _type: str, template: str) -> None:
+        """
+        Register template of code for one param of type, ANY_TYPE is used for types without own template.
+        Fields: {name}, {_type}, {pmml_name}, {method}, {score_name}.
+        """
+
+        self.renderers[(target, _type)] = compile_template(template)
+
+    def register_section(self, target: str, title: str, templates: dict[str, str]) -> None:
+        """Register new card section with templates by param type."""
+
+        for _type, template in templates.items():
+            self.register(target, _type, template)
+
+        self.sections[target] = title
+
+    def get_types(self, target: str) -> list[str]:
+        return [_type for (name, _type) in self.renderers if name == target]
+
+    def get_missing_targets(self, _type: str, sections: bool = False) -> list[str]:
+        """Return targets which can not render param of type: targets of core code or, with sections=True, extra sections."""
+
+        targets = dict.fromkeys(target for target, _ in self.renderers if (target in self.sections) == sections)
+
+        return [target for target in targets if (target, _type) not in self.renderers and (target, ANY_TYPE) not in self.renderers]
+
+    def get_renderer(self, target: str, _type: str) -> Callable[..., str]:
+        renderer = self.renderers.get((target, _type)) or self.renderers.get((target, ANY_TYPE))
+
+        if renderer is None:
+            known = ", ".join(self.get_types(target)) or "none"
+            raise ValueError(f"No '{target}' template for type '{_type}', known types: {known}.")
+
+        return renderer
+
+    def render_lines(self, target: str, params: Iterable[FullParam], score_name: str = "", skip_missing: bool = False) -> list[str]:
+        """Return rendered code of every param, skip_missing - params of types without template are left out."""
+
+        result = []
+        # Renderer is looked up once for every type of the batch
+        renderers = {}
+
+        for param in params:
+            if param._type not in renderers:
+                try:
+                    renderers[param._type] = self.get_renderer(target, param._type)
+                except ValueError as e:
+                    if not skip_missing:
+                        log.error(f"Param '{param.pmml_name}': {e}")
+                        raise
+
+                    # Already reported by validation of params
+                    renderers[param._type] = None
+
+            renderer = renderers[param._type]
+
+            if renderer is None:
+                continue
+
+            result.append(renderer(
+                name=param.name,
+                _type=param._type,
+                pmml_name=param.pmml_name,
+                method=param.method,
+                score_name=score_name,
+            ))
+
+        return result
+
+    def render(self, target: str, params: Iterable[FullParam], score_name: str = "", skip_missing: bool = False) -> str:
+        return "".join(self.render_lines(target, params, score_name, skip_missing))
+
+
+templates = TemplateRegistry()
+
+register_template = templates.register
+register_section = templates.register_section
+
+
+# OMDM method: value from score variables, data method if it is missing
+templates.register("omdm_logic", "decimal", (
+    'xScoreInput.{name} := dmi_App_Get_ScoreVariableValue("#{name}");\n'
+    'if(xScoreInput.{name} = -99999) then\n'
+    '    xScoreInput.{name} = {method};\n'
+    'endif\n'
+))
+templates.register("omdm_logic", "string", (
+    'xScoreInput.{name} := dms_App_Get_NumToStr(dmi_App_Get_ScoreVariableValue("#{name}"));\n'
+    'if(xScoreInput.{name} = "-99999") then\n'
+    '    xScoreInput.{name} = dms_App_Get_NumToStr({method});\n'
+    'endif\n'
+))
+
+# OMDM logging of params to CDA
+templates.register("omdm_logging", "decimal", 'dmw_App_AddScoreCardVariablesParam2CDA("{name}", xScoreInput.{name});\n')
+templates.register("omdm_logging", "string", 'dmw_App_AddScoreCardVariablesParam2CDA("{name}", Val(xScoreInput.{name}));\n')
+
+# Blaze input of score model
+templates.register("blaze_param", "decimal", "\t_{score_name}In.{pmml_name} = theApp.CDA_NdScoreModel.Cda_NdScoreModelInputInfo.{name};\n")
+templates.register("blaze_param", "string", "\t_{score_name}In.{pmml_name} = portable().toInteger(theApp.CDA_NdScoreModel.Cda_NdScoreModelInputInfo.{name});\n")
+
+# XPATH of param in CDA, the same for all types
+templates.register("report_standard", ANY_TYPE, "/Application/CDA[@CDAISACTIVE='Active']/CDAScore/CDAScoreParam[@CDASPNAME='{name}']/@CDASPVALUE\n")
+templates.register("report_advanced", ANY_TYPE, "\\#{name}=/Application/CDA[@CDAISACTIVE='Active']/CDAScore/CDAScoreParam[@CDASPNAME='{name}']/@CDASPVALUE")
@@ -0,0 +1,129 @@
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Iterable
+
+from src.data_classes import ExcelParam, OMDMParam, PMMLCard
+from src.settings import get_logger
+
+
+log = get_logger("validation.log")
+
+# Kinds of problems found in the join of pmml, model.txt and xlsx params
+ISSUE_KINDS = {
+    "missing_omdm": "param is not in model.txt, it is skipped in generated code",
+    "ambiguous_omdm": "model.txt has several params with this name in different case",
+    "unknown_type": "there is no code template for type of param, it is skipped in generated code",
+    "missing_section_template": "extra card section has no template for type of param, it is left out of the section",
+    "missing_xlsx": "param is not in xlsx, method is empty",
+    "method_conflict": "param has more than one method in xlsx",
+}
+
+# Params with these problems can not be generated
+SKIPPED_KINDS = ("missing_omdm", "unknown_type")
+
+
+@dataclass(slots=True)
+class ValidationIssue:
+    # One problem of one param and score cards using it
+    kind: str
+    param: str
+    detail: str = ""
+    cards: list[str] = field(default_factory=list)
+
+
+def check_param(param_name: str, omdm_info: OMDMParam, excel_info: ExcelParam, omdm_candidates: list[OMDMParam], missing_targets: list[str], missing_sections: list[str] = ()) -> list[ValidationIssue]:
+    """
+    Return all problems of one resolved param.
+
+    omdm_candidates: OMDM params with the same name in different case, empty if name is not ambiguous
+    missing_targets: core code targets without template for type of param
+    missing_sections: extra card sections without template for type of param
+    """
+
+    result = []
+
+    if omdm_info is None:
+        result.append(ValidationIssue("missing_omdm", param_name))
+
+    names = [param.name for param in omdm_candidates]
+    if names and param_name not in names:
+        result.append(ValidationIssue("ambiguous_omdm", param_name, f"{', '.join(names)}; '{omdm_info.name}' is used"))
+
+    if missing_targets:
+        result.append(ValidationIssue("unknown_type", param_name, f"type '{omdm_info._type}', no templates for: {', '.join(missing_targets)}"))
+
+    if missing_sections:
+        result.append(ValidationIssue("missing_section_template", param_name, f"type '{omdm_info._type}', no templates for: {', '.join(missing_sections)}"))
+
+    if not excel_info.name:
+        result.append(ValidationIssue("missing_xlsx", param_name))
+
+    if isinstance(excel_info.method, list) and len(excel_info.method) > 1:
+        result.append(ValidationIssue("method_conflict", param_name, ", ".join(map(str, excel_info.method))))
+
+    return result
+
+
+@dataclass
+class ValidationReport:
+    """All problems of params of checked cards."""
+
+    cards: int = 0
+    params: int = 0
+    issues: list[ValidationIssue] = field(default_factory=list)
+
+    @classmethod
+    def from_issues(cls, cards: Iterable[PMMLCard], issues: dict[str, list[ValidationIssue]]) -> "ValidationReport":
+        """Return report with problems of params used by cards, every problem lists its cards."""
+
+        report = cls()
+        found = {}
+        param_names = set()
+
+        for card in cards:
+            report.cards += 1
+
+            for param_name in dict.fromkeys(card.params):
+                param_names.add(param_name)
+
+                for issue in issues.get(param_name, ()):
+                    key = (issue.kind, issue.param)
+                    if key not in found:
+                        found[key] = ValidationIssue(issue.kind, issue.param, issue.detail)
+                    found[key].cards.append(card.score_name)
+
+        report.params = len(param_names)
+        report.issues = list(found.values())
+
+        return report
+
+    def get_counts(self) -> dict[str, int]:
+        counts = {}
+
+        for issue in self.issues:
+            counts[issue.kind] = counts.get(issue.kind, 0) + 1
+
+        return counts
+
+    def to_dict(self) -> dict:
+        return {
+            "cards": self.cards,
+            "params": self.params,
+            "counts": self.get_counts(),
+            "kinds": {kind: ISSUE_KINDS[kind] for kind in self.get_counts()},
+            "issues": [asdict(issue) for issue in self.issues],
+        }
+
+    def write_json(self, filename: str) -> None:
+        with open(filename, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+        log.info(f"Validation report with {len(self.issues)} issues was written to '{filename}'.")
+
+    def log_issues(self) -> None:
+        for issue in self.issues:
+            detail = f" ({issue.detail})" if issue.detail else ""
+            log.error(f"{issue.kind}: '{issue.param}'{detail} in cards: {', '.join(issue.cards)}.")
+
+        counts = ", ".join(f"{count} {kind}" for kind, count in self.get_counts().items()) or "no issues"
+        log.info(f"Validated {self.cards} cards with {self.params} params: {counts}.")
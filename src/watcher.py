@@ -0,0 +1,225 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+from src.cache import ParseCache
+from src.card_writer import CardWriter
+from src.code_generators import CodeCombiner
+from src.data_classes import PMMLCard, PMMLCardExt
+from src.dir_handler import DirHandler
+from src.manifest import CardManifest
+from src.params_handler import METHOD_COLUMN, NAME_COLUMN, OMDMExtractor, ParamsCombiner, XlsxExtractor
+from src.profiler import profiler
+from src.settings import get_logger, settings
+
+
+log = get_logger("watcher.log")
+
+
+def get_file_stat(filename: str) -> tuple[int, int]:
+    """Return modification time and size of file, (0, 0) if it is gone."""
+
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return 0, 0
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass
+class ProjectWatcher:
+    """Keeps parsed inputs of project in memory and regenerates cards whose inputs change."""
+
+    # Directory with input files
+    path: str
+    output_dir: str
+    manifest_name: str = ".manifest.json"
+    cache: ParseCache = None
+    # Seconds between checks of input files
+    interval: float = settings.WATCH_INTERVAL
+    # Seconds input files should stay unchanged before cards are regenerated
+    debounce: float = settings.WATCH_DEBOUNCE
+    # Set to stop watching from another thread
+    stop_event: threading.Event = field(default_factory=threading.Event)
+    # Parsed pmml cards by file name
+    cards: dict[str, PMMLCard] = field(default_factory=dict)
+    # Modification time and size of watched files by file name
+    snapshot: dict[str, tuple[int, int]] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.params_combiner = ParamsCombiner(cache=self.cache, path=self.path)
+        self.writer = CardWriter(self.output_dir)
+        self.manifest = CardManifest(os.path.join(self.output_dir, self.manifest_name))
+        self.code_combiner = CodeCombiner()
+
+        self.cards = {card.source: card for card in self.params_combiner.pmml_data.full_pmml_data}
+        self.snapshot = self.get_snapshot()
+
+    def get_snapshot(self) -> dict[str, tuple[int, int]]:
+        """Return stat of model.txt and xlsx in use and all pmml files of project."""
+
+        files = DirHandler(self.path, recursive=settings.RECURSIVE_SEARCH)
+        filenames = [self.params_combiner.omdm_data.filename, self.params_combiner.excel_data.filename, *files.pmml_files]
+
+        return {filename: get_file_stat(filename) for filename in filenames}
+
+    def wait_for_changes(self) -> dict[str, tuple[int, int]]:
+        """Poll files until something changes and stays unchanged for debounce seconds, return new snapshot."""
+
+        while not self.stop_event.wait(self.interval):
+            snapshot = self.get_snapshot()
+
+            if snapshot == self.snapshot:
+                continue
+
+            # Files are often saved in several writes, wait until they are complete
+            stable_since = time.monotonic()
+
+            while not self.stop_event.wait(self.interval):
+                current = self.get_snapshot()
+
+                if current != snapshot:
+                    snapshot = current
+                    stable_since = time.monotonic()
+                    continue
+
+                if time.monotonic() - stable_since >= self.debounce:
+                    return snapshot
+
+        return self.snapshot
+
+    def reload_sources(self, changed: set[str]) -> set[str]:
+        """Parse again changed model.txt or xlsx, return pmml files whose params are resolved differently."""
+
+        old = self.params_combiner
+        omdm_data = old.omdm_data
+        excel_data = old.excel_data
+
+        # Extractors log parsing errors and return no params, old ones are kept until the file is saved correctly
+        if omdm_data.filename in changed:
+            new_omdm_data = OMDMExtractor(omdm_data.filename, cache=self.cache)
+
+            if new_omdm_data.model_params:
+                omdm_data = new_omdm_data
+            else:
+                log.error(f"No params were parsed from '{omdm_data.filename}', previous version is used.")
+
+        if excel_data.filename in changed:
+            new_excel_data = XlsxExtractor(excel_data.filename, cache=self.cache, reader=settings.XLSX_READER)
+
+            if {NAME_COLUMN, METHOD_COLUMN}.issubset(new_excel_data.sheet.columns) and not new_excel_data.params_table.empty:
+                excel_data = new_excel_data
+            else:
+                log.error(f"No params were parsed from '{excel_data.filename}', previous version is used.")
+
+        if omdm_data is old.omdm_data and excel_data is old.excel_data:
+            return set()
+
+        # Old state is kept until new sources are parsed and all params are resolved
+        params_combiner = ParamsCombiner(excel_data, omdm_data, old.pmml_data, cache=self.cache, path=self.path)
+        params_combiner.resolve_params(list(self.cards.values()))
+
+        old_params = old.resolved_params
+        self.params_combiner = params_combiner
+
+        changed_params = {
+            name for name, param in params_combiner.resolved_params.items()
+            if name not in old_params or old_params[name] != param
+        }
+
+        return {source for source, card in self.cards.items() if not changed_params.isdisjoint(card.params)}
+
+    def reload_pmml(self, changed: set[str], removed: set[str]) -> set[str]:
+        """Parse again changed and new pmml files, forget removed ones, return pmml files to regenerate."""
+
+        pmml_data = self.params_combiner.pmml_data
+
+        for filename in removed:
+            self.cards.pop(filename, None)
+            pmml_data.errors.pop(filename, None)
+
+        for filename in changed:
+            pmml_data.errors.pop(filename, None)
+            card = pmml_data.get_pmml_data(filename)
+
+            # Card of file which is not parsed anymore is removed, it is written again when file is fixed
+            if filename in pmml_data.errors:
+                self.cards.pop(filename, None)
+            else:
+                self.cards[filename] = card
+
+        pmml_data.report_errors()
+
+        return changed
+
+    def get_card(self, card: PMMLCard) -> PMMLCardExt:
+        return PMMLCardExt(card.score_name, self.params_combiner.prepare_score_card(card), card.source)
+
+    def write_cards(self, sources: set[str]) -> list[str]:
+        """Generate and write cards of pmml files, cards with the same inputs are not written again."""
+
+        written = []
+
+        for source in sorted(sources):
+            card = self.cards.get(source)
+
+            # Files which were not parsed have no card
+            if card is None:
+                continue
+
+            card_ext = self.get_card(card)
+            fingerprint = self.manifest.get_fingerprint(card_ext)
+            filename = self.writer.get_card_filename(card_ext.score_name)
+
+            if not self.manifest.is_changed(card_ext, fingerprint, filename):
+                continue
+
+            written.append(self.writer.write_card(card_ext.score_name, self.code_combiner.get_code_for_card(card_ext)))
+            self.manifest.update(card_ext, fingerprint, filename)
+
+        self.manifest.remove_missing({card.score_name for card in self.cards.values()})
+        self.manifest.save()
+
+        return written
+
+    def apply_changes(self, snapshot: dict[str, tuple[int, int]]) -> list[str]:
+        """Parse again only changed files and regenerate affected cards, return written files."""
+
+        changed = {filename for filename, stat in snapshot.items() if self.snapshot.get(filename) != stat}
+        removed = set(self.snapshot) - set(snapshot)
+        sources = {self.params_combiner.omdm_data.filename, self.params_combiner.excel_data.filename}
+
+        self.snapshot = snapshot
+
+        with profiler.stage("watch_update"):
+            affected = self.reload_pmml(changed - sources, removed - sources)
+
+            if changed & sources:
+                affected |= self.reload_sources(changed & sources)
+
+            return self.write_cards(affected)
+
+    def run(self) -> None:
+        """Write all cards, then regenerate cards on every change until stopped."""
+
+        written = self.write_cards(set(self.cards))
+        log.info(f"{len(written)} cards were written, watching '{self.path}' for changes.")
+
+        while not self.stop_event.is_set():
+            snapshot = self.wait_for_changes()
+
+            if self.stop_event.is_set():
+                break
+
+            start = time.perf_counter()
+
+            try:
+                written = self.apply_changes(snapshot)
+            except Exception as e:
+                # Keep watching, the file may be saved again in a correct state
+                log.error(f"Cards were not updated - {type(e).__name__}: {e}")
+                continue
+
+            log.info(f"{len(written)} cards were updated in {time.perf_counter() - start:.3f} s.")